@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure the memory used by capability objects, and the time spent to
+create, fill and export them.
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import resource
+import time
+from decimal import Decimal
+
+from weboob.capabilities.bank import Transaction
+
+
+def create(count):
+    objects = []
+    for i in xrange(count):
+        tr = Transaction(i)
+        tr.date = datetime.date(2015, 1, 1)
+        tr.label = u'Transaction %d' % i
+        tr.amount = Decimal('-%d.42' % i)
+        objects.append(tr)
+    return objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--objects', type=int, default=50000, help='number of objects')
+    args = parser.parse_args()
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    objects = create(args.objects)
+    created = time.time()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+
+    labels = sum(len(tr.label) for tr in objects)
+    read = time.time()
+    dicts = [tr.to_dict() for tr in objects]
+    exported = time.time()
+    copies = [tr.copy() for tr in objects]
+    copied = time.time()
+    columns = Transaction.to_columns(objects)
+    columned = time.time()
+    assert labels and len(dicts) == len(copies) == len(columns['id']) == args.objects
+
+    print('%d Transaction objects' % args.objects)
+    print('memory: %.1f MiB (%d bytes per object)' % (rss / 1024., rss * 1024 / args.objects))
+    print('create: %.2fs, read: %.2fs, to_dict: %.2fs, copy: %.2fs, to_columns: %.2fs' % (
+          created - start, read - created, exported - read, copied - exported, columned - copied))
+
+
+if __name__ == '__main__':
+    main()
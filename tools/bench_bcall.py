@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure the latency of Weboob.do() with fake backends.
+
+The overhead is the time spent by do() on top of the slowest backend.
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+from threading import RLock
+
+from weboob.core.ouiboube import WebNip
+
+
+class FakeBackend(object):
+    def __init__(self, name, delay, results):
+        self.name = name
+        self.delay = delay
+        self.results = results
+        self.lock = RLock()
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, t, v, tb):
+        self.lock.release()
+
+    def __repr__(self):
+        return '<FakeBackend %r>' % self.name
+
+    def iter_results(self):
+        time.sleep(self.delay)
+        for i in xrange(self.results):
+            yield i
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--backends', type=int, default=40, help='number of fake backends')
+    parser.add_argument('-r', '--results', type=int, default=10, help='results yielded by each backend')
+    parser.add_argument('-d', '--delay', type=float, default=0.01, help='seconds spent by each backend')
+    parser.add_argument('-c', '--calls', type=int, default=100, help='number of do() calls')
+    parser.add_argument('-p', '--pool-size', type=int, default=None, help='size of the worker pool')
+    args = parser.parse_args()
+
+    weboob = WebNip(modules_path=False, pool_size=args.pool_size)
+    for i in xrange(args.backends):
+        name = 'fake%d' % i
+        weboob.backend_instances[name] = FakeBackend(name, args.delay, args.results)
+
+    overheads = []
+    for _ in xrange(args.calls):
+        start = time.time()
+        count = sum(1 for _ in weboob.do('iter_results'))
+        overheads.append(time.time() - start - args.delay)
+        assert count == args.backends * args.results
+
+    weboob.pool.shutdown()
+
+    overheads.sort()
+    print('%d calls on %d backends (pool size %d)' % (args.calls, args.backends, weboob.pool.size))
+    print('overhead: mean %.2fms, median %.2fms, max %.2fms' % (1000 * sum(overheads) / len(overheads),
+                                                               1000 * overheads[len(overheads) // 2],
+                                                               1000 * overheads[-1]))
+
+
+if __name__ == '__main__':
+    main()
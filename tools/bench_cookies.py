@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure the number of requests per second done by a Browser with many
+cookies, against a local stub server.
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+from threading import Thread
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+
+from requests.cookies import create_cookie
+
+from weboob.browser.browsers import DomainBrowser
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Send headers and body in one packet.
+    wbufsize = -1
+
+    def do_GET(self):
+        if self.path.startswith('/redirect'):
+            self.send_response(302)
+            self.send_header('Location', '/account/page')
+            self.send_header('Set-Cookie', 'redirected=1; Path=/')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = self.headers.get('Cookie', '')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--requests', type=int, default=500, help='number of requests')
+    parser.add_argument('-c', '--cookies', type=int, default=50, help='cookies of the server host')
+    parser.add_argument('-o', '--others', type=int, default=200, help='cookies of other domains')
+    parser.add_argument('-r', '--redirect', action='store_true', help='request an URL which redirects')
+    args = parser.parse_args()
+
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    thread = Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    browser = DomainBrowser(baseurl='http://127.0.0.1:%d' % server.server_port)
+    for i in xrange(args.cookies):
+        path = '/account' if i % 2 else '/'
+        browser.session.cookies.set_cookie(create_cookie('cookie%d' % i, 'x' * 20, domain='127.0.0.1', path=path))
+    for i in xrange(args.others):
+        browser.session.cookies.set_cookie(create_cookie('other%d' % i, 'x' * 20, domain='other%d.example.org' % (i % 10)))
+
+    path = '/redirect' if args.redirect else '/account/page'
+    sent = browser.open(path).text.count('=')
+
+    start = time.time()
+    for _ in xrange(args.requests):
+        browser.open(path)
+    duration = time.time() - start
+
+    browser.session.close()
+    server.shutdown()
+    print('%d requests with %d cookies in the jar, %d sent' % (args.requests, len(browser.session.cookies), sent))
+    print('%.1f requests/s, %.2fms per request' % (args.requests / duration, 1000 * duration / args.requests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure the time spent to parse a large synthetic table page with
+ListElement/TableElement and ItemElement.
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+
+from requests.models import Response
+
+from weboob.browser.browsers import Browser
+from weboob.browser.elements import TableElement, ItemElement, method
+from weboob.browser.filters.standard import CleanText, CleanDecimal, Date, Env, Format, TableCell
+from weboob.browser.pages import HTMLPage
+from weboob.capabilities.bank import Transaction
+from weboob.tools.xpath import xpath_cache
+
+
+class HistoryTable(TableElement):
+    head_xpath = '//table/thead/tr/th'
+    item_xpath = '//table/tbody/tr'
+
+    col_date = u'Date'
+    col_label = [u'Label', u'Name']
+    col_amount = u'Amount'
+    col_category = u'Category'
+
+    class item(ItemElement):
+        klass = Transaction
+
+        obj_id = Format('%s-%s', Env('account'), CleanText(TableCell('label')))
+        obj_date = Date(CleanText(TableCell('date')), dayfirst=True)
+        obj_label = CleanText(TableCell('label'))
+        obj_category = CleanText(TableCell('category'))
+        obj_amount = CleanDecimal(TableCell('amount'), replace_dots=True)
+
+        def obj_raw(self):
+            return u'%s %s' % (self.env['account'], self.obj.label)
+
+        def parse(self, el):
+            self.env['tags'].append(self.obj.id)
+
+
+class TablePage(HTMLPage):
+    iter_history = method(HistoryTable)
+
+
+def build_page(rows):
+    html = [u'<html><body><table><thead><tr>',
+            u'<th>Date</th><th>Label</th><th>Category</th><th>Amount</th>',
+            u'</tr></thead><tbody>']
+    for i in xrange(rows):
+        html.append(u'<tr><td>%02d/01/2015</td><td>Transaction  %d</td><td>Misc</td><td>-%d,42</td></tr>' %
+                    (i % 28 + 1, i, i))
+    html.append(u'</tbody></table></body></html>')
+
+    response = Response()
+    response.status_code = 200
+    response.url = 'http://weboob.org/history'
+    response._content = u''.join(html).encode('utf-8')
+    response.encoding = 'utf-8'
+
+    params = {'account': u'12345', 'tags': [], 'options': {'currency': u'EUR', 'pages': range(10)}}
+    return TablePage(Browser(), response, params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-r', '--rows', type=int, default=500, help='number of rows in the table')
+    parser.add_argument('-n', '--runs', type=int, default=20, help='number of parsings of the page')
+    parser.add_argument('-c', '--compile', action='store_true', help='compile filters of items')
+    parser.add_argument('-s', '--streaming', action='store_true', help='build items one after the other')
+    args = parser.parse_args()
+
+    HistoryTable.item.compile_filters = args.compile
+    HistoryTable.streaming = args.streaming
+
+    page = build_page(args.rows)
+    durations = []
+    firsts = []
+    for _ in xrange(args.runs):
+        start = time.time()
+        count = 0
+        for _ in page.iter_history():
+            if count == 0:
+                firsts.append(time.time() - start)
+            count += 1
+        durations.append(time.time() - start)
+        assert count == args.rows
+
+    durations.sort()
+    firsts.sort()
+    options = [name for name in ('compile', 'streaming') if getattr(args, name)]
+    print('%d runs on a table of %d rows%s' % (args.runs, args.rows, ' (%s)' % ', '.join(options) if options else ''))
+    print('parsing: mean %.1fms, median %.1fms, min %.1fms' % (1000 * sum(durations) / len(durations),
+                                                               1000 * durations[len(durations) // 2],
+                                                               1000 * durations[0]))
+    print('first result: median %.2fms' % (1000 * firsts[len(firsts) // 2]))
+    print('xpath cache: %(hits)d hits, %(misses)d misses, %(size)d selectors' % xpath_cache.stats())
+
+
+if __name__ == '__main__':
+    main()
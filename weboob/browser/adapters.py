@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+from threading import Lock, local
+
+from requests import adapters
+from requests.utils import prepend_scheme_if_needed
+# Use the urllib3 of requests, which may be bundled with old versions.
+try:
+    from requests.packages.urllib3.poolmanager import PoolManager, proxy_from_url
+    from requests.packages.urllib3.util import parse_url
+except ImportError:
+    from urllib3.poolmanager import PoolManager, proxy_from_url
+    from urllib3.util import parse_url
+try:
+    from requests.utils import select_proxy
+except ImportError:
+    # requests < 2.10
+    def select_proxy(url, proxies):
+        """
+        Select the proxy of an URL, like requests does.
+        """
+        proxies = proxies or {}
+        urlparts = parse_url(url)
+        if urlparts.host is None:
+            return proxies.get(urlparts.scheme, proxies.get('all'))
+
+        for key in (urlparts.scheme + '://' + urlparts.host, urlparts.scheme, 'all://' + urlparts.host, 'all'):
+            if key in proxies:
+                return proxies[key]
+        return None
+
+from weboob.tools.log import getLogger
+
+
+__all__ = ['PoolRegistry', 'pool_registry', 'HTTPAdapter']
+
+
+class PoolRegistry(object):
+    """
+    Pool managers of urllib3 shared by every browser of the process.
+
+    A pool manager is kept for each proxy and TLS settings, and holds a
+    pool of connections for each scheme and host.
+    """
+
+    def __init__(self):
+        self.logger = getLogger('browser.pools')
+        self.managers = {}
+        self.lock = Lock()
+
+    def get(self, key, build):
+        """
+        Get the pool manager of a key, or build it.
+
+        :param key: hashable settings of the manager
+        :param build: function which creates the manager
+        :type build: :class:`callable`
+        """
+        with self.lock:
+            try:
+                return self.managers[key]
+            except KeyError:
+                self.logger.debug('New pool manager for %r', key)
+                manager = self.managers[key] = build()
+                return manager
+
+    def clear(self):
+        """
+        Close every shared connection.
+        """
+        with self.lock:
+            for manager in self.managers.itervalues():
+                manager.clear()
+            self.managers.clear()
+
+
+pool_registry = PoolRegistry()
+"""
+Registry used by adapters which share their connections.
+"""
+
+
+class HTTPAdapter(adapters.HTTPAdapter):
+    """
+    Transport adapter which can take its connections from
+    :data:`pool_registry`, to share them with other browsers connecting to
+    the same hosts with the same proxy and TLS settings.
+
+    Only connections are shared, as cookies are handled by sessions.
+
+    :param share_pools: use shared connections
+    :type share_pools: :class:`bool`
+    """
+
+    __attrs__ = adapters.HTTPAdapter.__attrs__ + ['share_pools']
+
+    def __init__(self, *args, **kwargs):
+        self.share_pools = kwargs.pop('share_pools', False)
+        # TLS settings of the request being sent by each thread
+        self.tls = local()
+        super(HTTPAdapter, self).__init__(*args, **kwargs)
+
+    def __setstate__(self, state):
+        self.tls = local()
+        super(HTTPAdapter, self).__setstate__(state)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if isinstance(cert, list):
+            cert = tuple(cert)
+        self.tls.settings = (verify, cert)
+        return super(HTTPAdapter, self).send(request, stream, timeout, verify, cert, proxies)
+
+    def get_connection(self, url, proxies=None):
+        if not self.share_pools:
+            return super(HTTPAdapter, self).get_connection(url, proxies)
+
+        proxy = select_proxy(url, proxies)
+        if proxy:
+            proxy = prepend_scheme_if_needed(proxy, 'http')
+            if proxy.lower().startswith('socks') or not parse_url(proxy).host:
+                # Not shared, and malformed proxies are reported by requests.
+                return super(HTTPAdapter, self).get_connection(url, proxies)
+
+        # Pools of a manager are created with the TLS settings checked by
+        # cert_verify(), so they are the same for every browser using them.
+        verify, cert = getattr(self.tls, 'settings', (True, None))
+        key = (proxy, verify, cert, self._pool_maxsize, self._pool_block)
+        manager = pool_registry.get(key, lambda: self._build_manager(proxy))
+        return manager.connection_from_url(url)
+
+    def _build_manager(self, proxy):
+        kwargs = dict(num_pools=self._pool_connections, maxsize=self._pool_maxsize, block=self._pool_block)
+        if proxy:
+            return proxy_from_url(proxy, proxy_headers=self.proxy_headers(proxy), **kwargs)
+        return PoolManager(strict=True, **kwargs)
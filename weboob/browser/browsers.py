@@ -33,8 +33,9 @@ except ImportError:
     from urlparse import urlparse, urljoin
 import os
 import sys
-from copy import deepcopy
 import inspect
+from collections import deque
+from threading import RLock
 
 try:
     import requests
@@ -44,15 +45,20 @@ except ImportError:
     raise ImportError('Please install python-requests >= 2.0')
 
 from weboob.tools.log import getLogger
+from weboob.tools.lrucache import LRUCache
 from weboob.tools.ordereddict import OrderedDict
 from weboob.tools.json import json
 
+from .adapters import HTTPAdapter
+from .cache import HTTPCache, CacheAdapter
 from .cookies import WeboobCookieJar
 from .exceptions import HTTPNotFound, ClientError, ServerError
 from .sessions import FuturesSession
 from .profiles import Firefox
+from .ratelimit import RateLimiter
+from .retry import RetryMetrics, RetryRequest
 from .pages import NextPage
-from .url import URL
+from .url import URL, compile_url_regex, literal_prefix
 
 
 class Browser(object):
@@ -91,11 +97,74 @@ class Browser(object):
     Maximum of threads for asynchronous requests.
     """
 
+    RATE = None
+    """
+    Maximum number of requests per second to a host, or None.
+    """
+
+    BURST = 1
+    """
+    Number of requests which can be sent at once to a host after an idle
+    period, when :attr:`RATE` is set.
+    """
+
+    MAX_CONCURRENCY = None
+    """
+    Maximum number of requests sent at the same time to a host, or None.
+
+    When one of these limits is set, they are shared by every browser of the
+    class, and requests to a host are also paused when it answers 429 or 503
+    (see :class:`weboob.browser.ratelimit.HostLimiter`).
+    """
+
+    RETRY_POLICY = None
+    """
+    :class:`weboob.browser.retry.RetryPolicy` of requests, or None to not
+    send them again. Counters are in :attr:`retry_metrics`.
+
+    It is applied on top of :attr:`MAX_RETRIES`, which only retries
+    connections.
+    """
+
+    SHARE_CONNECTIONS = False
+    """
+    Reuse connections opened by other browsers of the process to the same
+    hosts, with the same proxy and TLS settings (see
+    :class:`weboob.browser.adapters.PoolRegistry`). Cookies are still kept
+    by each browser.
+    """
+
+    HTTP2 = False
+    """
+    Send HTTPS requests with HTTP/2, so concurrent requests to a host are
+    multiplexed on a single connection (see
+    :class:`weboob.browser.http2.HTTP2Adapter`). It requires python-hyper,
+    and is ignored when :attr:`HTTP_CACHE` is set.
+    """
+
     ALLOW_REFERRER = True
     """
     Controls the behavior of get_referrer.
     """
 
+    HTTP_CACHE = None
+    """
+    Directory where GET responses are cached on disk, honoring
+    Cache-Control, Expires, ETag and Last-Modified headers. Requests
+    sending cookies or credentials are never cached.
+    Disabled if None.
+    """
+
+    HTTP_CACHE_SIZE = 64 * 1024 * 1024
+    """
+    Maximum size in bytes of the HTTP cache directory.
+    """
+
+    HTTP_CACHE_POLICY = None
+    """
+    Default :class:`weboob.browser.cache.CachePolicy` of requests.
+    """
+
     @classmethod
     def asset(cls, localfile):
         """
@@ -111,6 +180,7 @@ class Browser(object):
         self._setup_session(self.PROFILE)
         self.url = None
         self.response = None
+        self.retry_metrics = RetryMetrics()
 
         self.responses_dirname = responses_dirname
         self.responses_count = 1
@@ -196,13 +266,13 @@ class Browser(object):
 
         # defines a max_retries. It's mandatory in case a server is not
         # handling keep alive correctly, like the proxy burp
-        adapter_kwargs = dict(max_retries=self.MAX_RETRIES)
+        adapter_kwargs = dict(max_retries=self.MAX_RETRIES, share_pools=self.SHARE_CONNECTIONS)
         # set connection pool size equal to MAX_WORKERS if needed
         if self.MAX_WORKERS > requests.adapters.DEFAULT_POOLSIZE:
             adapter_kwargs.update(pool_connections=self.MAX_WORKERS,
                                   pool_maxsize=self.MAX_WORKERS)
-        session.mount('https://', requests.adapters.HTTPAdapter(**adapter_kwargs))
-        session.mount('http://', requests.adapters.HTTPAdapter(**adapter_kwargs))
+        session.mount('https://', self._create_adapter('https', adapter_kwargs))
+        session.mount('http://', self._create_adapter('http', adapter_kwargs))
 
         if self.TIMEOUT:
             session.timeout = self.TIMEOUT
@@ -218,9 +288,40 @@ class Browser(object):
 
         session.cookies = WeboobCookieJar()
 
+        if self.RATE is not None or self.MAX_CONCURRENCY is not None:
+            session.limiter = RateLimiter.get((self.__class__, self.RATE, self.BURST, self.MAX_CONCURRENCY),
+                                              self.RATE, self.BURST, self.MAX_CONCURRENCY)
+
+    def _create_adapter(self, scheme, adapter_kwargs):
+        """
+        Create the transport adapter which sends requests of an URL scheme.
+
+        This method can be overridden to use another transport.
+        """
+        if self.HTTP_CACHE:
+            if self.HTTP2 and scheme == 'https':
+                self.logger.warning('HTTP2 is ignored, as HTTP_CACHE is set')
+            cache = HTTPCache.get(self.HTTP_CACHE, self.HTTP_CACHE_SIZE)
+            return CacheAdapter(cache, self.get_cache_policy, **adapter_kwargs)
+        if self.HTTP2 and scheme == 'https':
+            from .http2 import HTTP2Adapter
+            # There is a single connection per host, pools are not used.
+            return HTTP2Adapter(max_retries=adapter_kwargs['max_retries'])
+        return HTTPAdapter(**adapter_kwargs)
+
     def set_profile(self, profile):
         profile.setup_session(self.session)
 
+    def get_cache_policy(self, request):
+        """
+        Get the :class:`weboob.browser.cache.CachePolicy` to apply on a
+        request, when :attr:`HTTP_CACHE` is enabled.
+
+        :param request: prepared request
+        :type request: :class:`requests.PreparedRequest`
+        """
+        return self.HTTP_CACHE_POLICY
+
     def location(self, url, **kwargs):
         """
         Like :meth:`open` but also changes the current URL and response.
@@ -293,10 +394,11 @@ class Browser(object):
         req = self.build_request(url, referrer, data_encoding=data_encoding, **kwargs)
         preq = self.prepare_request(req)
 
-        if hasattr(preq, '_cookies'):
+        if hasattr(preq, '_cookies') and not isinstance(preq._cookies, WeboobCookieJar):
             # The _cookies attribute is not present in requests < 2.2. As in
             # previous version it doesn't calls extract_cookies_to_jar(), it is
             # not a problem as we keep our own cookiejar instance.
+            # WeboobSession already gives a WeboobCookieJar.
             preq._cookies = WeboobCookieJar.from_cookiejar(preq._cookies)
 
         if proxies is None:
@@ -317,16 +419,22 @@ class Browser(object):
             self.raise_for_status(response)
             return callback(response)
 
+        send_kwargs = dict(allow_redirects=allow_redirects,
+                           stream=stream,
+                           timeout=timeout,
+                           verify=verify,
+                           cert=cert,
+                           proxies=proxies)
+
+        if self.RETRY_POLICY is not None:
+            send = lambda callback, async: self.session.send(preq.copy(), callback=callback, async=async, **send_kwargs)
+            return RetryRequest(self.RETRY_POLICY, self.retry_metrics, preq, send, self.logger).run(inner_callback, async)
+
         # call python-requests
         response = self.session.send(preq,
-                                     allow_redirects=allow_redirects,
-                                     stream=stream,
-                                     timeout=timeout,
-                                     verify=verify,
-                                     cert=cert,
-                                     proxies=proxies,
                                      callback=inner_callback,
-                                     async=async)
+                                     async=async,
+                                     **send_kwargs)
         return response
 
     def async_open(self, url, **kwargs):
@@ -564,6 +672,142 @@ class DomainBrowser(Browser):
         return self.location(self.BASEURL or self.absurl('/'))
 
 
+class Prefetcher(object):
+    """
+    Next pages fetched in background by :meth:`PagesBrowser.pagination`.
+
+    The element of the current page announces its next page with
+    :meth:`announce`, before processing its items. When :class:`NextPage` is
+    raised, the pagination takes the response with :meth:`pop`, or goes on
+    the page as usual if it has not been prefetched.
+
+    Only GET requests are prefetched.
+
+    :param browser: browser which fetches pages
+    :type browser: :class:`PagesBrowser`
+    :param depth: maximum number of pages fetched ahead
+    :type depth: :class:`int`
+    """
+
+    def __init__(self, browser, depth):
+        self.browser = browser
+        self.depth = depth
+        self.logger = getLogger('prefetcher', browser.logger)
+        self.lock = RLock()
+        # [key, future] of fetched pages, in order
+        self.queue = deque()
+        # next page to fetch once there is room in the queue
+        self.pending = None
+        # incremented when fetched pages are dropped, to stop their chain
+        self.generation = 0
+        self.closed = False
+
+    def key(self, request):
+        """
+        Get the URL which identifies a request, or None if it can't be
+        prefetched.
+        """
+        if isinstance(request, requests.Request):
+            if request.method not in (None, 'GET') or request.data:
+                return None
+            url, params = request.url, request.params
+        else:
+            url, params = request, None
+        return requests.Request('GET', self.browser.absurl(url), params=params).prepare().url
+
+    def announce(self, request, resolver=None):
+        """
+        Fetch in background the next page of the current one.
+
+        :param request: next page, as given to :class:`NextPage`
+        :param resolver: function called in background with each fetched
+                         page, which returns its next page or None, to fetch
+                         further pages
+        :type resolver: :class:`callable`
+        """
+        key = self.key(request)
+        if key is None:
+            return
+
+        with self.lock:
+            if self.queue and self.queue[0][0] == key:
+                # Already fetched while the previous page was processed.
+                return
+            self._cancel()
+            self._fetch(self.generation, key, request, self.browser.url, resolver)
+
+    def pop(self, request):
+        """
+        Get the future of the response to a request, if it is the next
+        prefetched page. Otherwise, drop every prefetched page.
+
+        :rtype: :class:`concurrent.futures.Future` or None
+        """
+        key = self.key(request)
+        with self.lock:
+            if key is None or not self.queue or self.queue[0][0] != key:
+                self._cancel()
+                return None
+
+            future = self.queue.popleft()[1]
+            if self.pending is not None:
+                pending, self.pending = self.pending, None
+                self._fetch(*pending)
+            return future
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self._cancel()
+
+    def _cancel(self):
+        for _, future in self.queue:
+            future.cancel()
+        self.queue.clear()
+        self.pending = None
+        self.generation += 1
+
+    def _fetch(self, generation, key, request, referrer, resolver):
+        with self.lock:
+            if self.closed or generation != self.generation:
+                return
+            if len(self.queue) >= self.depth:
+                self.pending = (generation, key, request, referrer, resolver)
+                return
+
+            callback = lambda response: self._fetched(generation, response, resolver)
+            try:
+                future = self.browser.async_open(request, referrer=referrer, callback=callback)
+            except Exception as e:
+                # It will be raised again if the pagination goes on this page.
+                self.logger.debug('Unable to prefetch %s: %s', key, e)
+                return
+            self.queue.append([key, future])
+            self.logger.debug('Prefetch %s', key)
+
+    def _fetched(self, generation, response, resolver):
+        if resolver is None or response.page is None or self.closed or generation != self.generation:
+            return response
+
+        try:
+            value = resolver(response.page)
+        except Exception as e:
+            self.logger.debug('Unable to find the page after %s: %s', response.url, e)
+            return response
+
+        if value is not None:
+            # The browser is still on a previous page.
+            if isinstance(value, requests.Request):
+                value.url = self.browser.absurl(value.url, response.url)
+            else:
+                value = self.browser.absurl(value, response.url)
+
+            key = self.key(value)
+            if key is not None:
+                self._fetch(generation, key, value, response.url, resolver)
+        return response
+
+
 class _PagesBrowserMeta(type):
     """
     Private meta-class used to keep order of URLs instances of PagesBrowser.
@@ -576,8 +820,10 @@ class _PagesBrowserMeta(type):
         if new_class._urls is None:
             new_class._urls = OrderedDict()
         else:
-            new_class._urls = deepcopy(new_class._urls)
+            new_class._urls = OrderedDict(new_class._urls)
         new_class._urls.update(urls)
+        # indexes of URLs to dispatch responses, by BASEURL
+        new_class._urls_indexes = LRUCache(16)
         return new_class
 
 
@@ -610,11 +856,29 @@ class PagesBrowser(DomainBrowser):
 
 
     _urls = None
+    """
+    URL definitions of the class, shared by every instance.
+    """
+
     __metaclass__ = _PagesBrowserMeta
 
+    PAGINATION_LOOKAHEAD = 0
+    """
+    Number of next pages that :meth:`pagination` fetches in background,
+    while items of the current page are processed.
+
+    The next page has to be known before items are processed, which is the
+    case of a :class:`weboob.browser.elements.ListElement` with a
+    ``next_page`` filter. Otherwise pages are fetched one after the other.
+
+    Prefetched pages are requested with :meth:`open`, so it is disabled
+    for browsers which override :meth:`location`, as they would not be
+    able to add headers or data to the requests of next pages.
+    """
+
     def __getattr__(self, name):
         if self._urls is not None and name in self._urls:
-            return self._urls[name]
+            return self._get_url(name)
         else:
             raise AttributeError("'%s' object has no attribute '%s'" % (
                 self.__class__.__name__, name))
@@ -623,9 +887,70 @@ class PagesBrowser(DomainBrowser):
         super(PagesBrowser, self).__init__(*args, **kwargs)
 
         self.page = None
-        self._urls = deepcopy(self._urls)
+        self.prefetcher = None
+
+    def _get_url(self, name):
+        """
+        Get an URL bound to this browser. It is bound once, on first access.
+        """
+        bound_urls = self.__dict__.setdefault('_bound_urls', {})
+        try:
+            return bound_urls[name]
+        except KeyError:
+            url = bound_urls[name] = self._urls[name].bind(self)
+            return url
+
+    def _get_urls_index(self):
+        """
+        Get the list of (literal prefix, URL name, compiled regexp) of every
+        URL regexp which can handle responses, in the order they are tried.
+
+        It is computed once for each browser class and BASEURL, and only
+        indexes of the last used BASEURLs are kept.
+        """
+        return self._urls_indexes.get(self.BASEURL, self._build_urls_index)
+
+    def _build_urls_index(self):
+        index = []
+        for name, url in self._urls.iteritems():
+            if url.klass is None:
+                continue
+            for regex in url.urls:
+                compiled = compile_url_regex(regex, self.BASEURL)
+                index.append((literal_prefix(compiled.pattern), name, compiled))
+        return index
+
+    def _handle_response(self, response):
+        """
+        Get the page of the first URL which handles the response.
+        """
+        if response.request.method == 'HEAD':
+            return None
+
+        tried = None
+        for prefix, name, regex in self._get_urls_index():
+            # Regexps of an URL are consecutive, and it can only handle the
+            # response with its first matching regexp.
+            if name == tried or not response.url.startswith(prefix):
+                continue
+
+            m = regex.match(response.url)
+            if m:
+                tried = name
+                page = self._get_url(name).handle(response, m)
+                if page is not None:
+                    return page
+        return None
+
+    def get_cache_policy(self, request):
+        """
+        Get the cache policy of the first :class:`URL` declaring one and
+        matching the request, or the default one.
+        """
         for url in self._urls.itervalues():
-            url.browser = self
+            if url.cache is not None and url.match(request.url, self.BASEURL):
+                return url.cache
+        return super(PagesBrowser, self).get_cache_policy(request)
 
     def open(self, *args, **kwargs):
         """
@@ -642,15 +967,10 @@ class PagesBrowser(DomainBrowser):
         # and `callback` params.
         def internal_callback(response):
             # Try to handle the response page with an URL instance.
-            response.page = None
-            for url in self._urls.itervalues():
-                page = url.handle(response)
-                if page is not None:
-                    self.logger.debug('Handle %s with %s' % (response.url, page.__class__.__name__))
-                    response.page = page
-                    break
-
-            if response.page is None:
+            response.page = self._handle_response(response)
+            if response.page is not None:
+                self.logger.debug('Handle %s with %s' % (response.url, response.page.__class__.__name__))
+            else:
                 self.logger.debug('Unable to handle %s' % response.url)
 
             return callback(response)
@@ -669,7 +989,9 @@ class PagesBrowser(DomainBrowser):
             self.page.on_leave()
 
         response = self.open(*args, **kwargs)
+        return self._load_response(response)
 
+    def _load_response(self, response):
         self.response = response
         self.page = response.page
         self.url = response.url
@@ -707,15 +1029,60 @@ class PagesBrowser(DomainBrowser):
         <weboob.browser.browsers.Page object at 0x...>
         >>> list(b.pagination(lambda: b.page.iter_values()))
         ['One', 'Two', 'Three', 'Four']
+
+        When :attr:`PAGINATION_LOOKAHEAD` is set, next pages are fetched in
+        background (see :class:`Prefetcher`), and results are still yielded
+        in order.
         """
+        if self.PAGINATION_LOOKAHEAD <= 0 or getattr(self.session, 'executor', None) is None or \
+           type(self).location.im_func is not PagesBrowser.location.im_func:
+            while True:
+                try:
+                    for r in func(*args, **kwargs):
+                        yield r
+                except NextPage as e:
+                    self.location(e.request)
+                else:
+                    return
+
+        prefetcher = Prefetcher(self, self.PAGINATION_LOOKAHEAD)
+        try:
+            while True:
+                try:
+                    for r in self._iter_prefetching(prefetcher, func, args, kwargs):
+                        yield r
+                except NextPage as e:
+                    future = prefetcher.pop(e.request)
+                    if future is None:
+                        self.location(e.request)
+                    else:
+                        if self.page is not None:
+                            self.page.on_leave()
+                        self._load_response(future.result())
+                else:
+                    return
+        finally:
+            # Also run when the consumer stops early.
+            prefetcher.close()
+
+    def _iter_prefetching(self, prefetcher, func, args, kwargs):
+        # Elements only see the prefetcher while code of the pagination is
+        # running, and not while the consumer handles results.
+        previous, self.prefetcher = self.prefetcher, prefetcher
+        try:
+            iterator = iter(func(*args, **kwargs))
+        finally:
+            self.prefetcher = previous
+
         while True:
+            previous, self.prefetcher = self.prefetcher, prefetcher
             try:
-                for r in func(*args, **kwargs):
-                    yield r
-            except NextPage as e:
-                self.location(e.request)
-            else:
+                r = next(iterator)
+            except StopIteration:
                 return
+            finally:
+                self.prefetcher = previous
+            yield r
 
 
 def need_login(func):
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import os
+import re
+import time
+import pickle
+import hashlib
+import tempfile
+from io import BytesIO
+from email.utils import parsedate_tz, mktime_tz
+from threading import Lock
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from weboob.tools.log import getLogger
+
+from .adapters import HTTPAdapter
+
+
+__all__ = ['CachePolicy', 'HTTPCache', 'CacheAdapter']
+
+
+class CachePolicy(object):
+    """
+    How responses of an URL are cached.
+
+    By default, the Cache-Control, Expires, ETag and Last-Modified headers
+    sent by the server are honored.
+
+    :param store: if False, responses are never cached
+    :type store: :class:`bool`
+    :param max_age: if set, responses are considered fresh during this
+                    number of seconds, whatever the server says
+    :type max_age: :class:`int`
+    """
+
+    def __init__(self, store=True, max_age=None):
+        self.store = store
+        self.max_age = max_age
+
+    def __repr__(self):
+        return '<CachePolicy store=%r max_age=%r>' % (self.store, self.max_age)
+
+
+class HTTPCache(object):
+    """
+    On-disk storage of HTTP responses, evicting least recently used entries
+    when its size exceeds `max_size` bytes.
+
+    Use :func:`get` to share an instance between every browser using the
+    same directory.
+    """
+    _instances = {}
+    _instances_lock = Lock()
+
+    @classmethod
+    def get(cls, path, max_size):
+        path = os.path.realpath(os.path.expanduser(path))
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path, max_size)
+            return cls._instances[path]
+
+    def __init__(self, path, max_size):
+        self.logger = getLogger('browser.cache')
+        self.path = path
+        self.max_size = max_size
+        self.lock = Lock()
+        # key -> (size, last access time)
+        self.index = None
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _load_index(self):
+        self.index = {}
+        for filename in os.listdir(self.path):
+            if filename.startswith('.'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.path, filename))
+            except OSError:
+                continue
+            self.index[filename] = (st.st_size, st.st_mtime)
+
+    def key(self, request):
+        return hashlib.sha1(request.url.encode('utf-8') if isinstance(request.url, unicode) else request.url).hexdigest()
+
+    def load(self, key):
+        """
+        Get a stored entry, or None.
+        """
+        filename = os.path.join(self.path, key)
+        try:
+            with open(filename, 'rb') as f:
+                entry = pickle.load(f)
+        except (IOError, OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+
+        with self.lock:
+            if self.index is None:
+                self._load_index()
+            now = time.time()
+            try:
+                os.utime(filename, (now, now))
+            except OSError:
+                pass
+            if key in self.index:
+                self.index[key] = (self.index[key][0], now)
+        return entry
+
+    def store(self, key, entry):
+        data = pickle.dumps(entry, -1)
+        if len(data) > self.max_size:
+            return
+
+        fd, tmpname = tempfile.mkstemp(dir=self.path, prefix='.')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.rename(tmpname, os.path.join(self.path, key))
+
+        with self.lock:
+            if self.index is None:
+                self._load_index()
+            self.index[key] = (len(data), time.time())
+            self._evict()
+
+    def _evict(self):
+        total = sum(size for size, _ in self.index.itervalues())
+        if total <= self.max_size:
+            return
+
+        for key, (size, _) in sorted(self.index.items(), key=lambda item: item[1][1]):
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(os.path.join(self.path, key))
+            except OSError:
+                pass
+            del self.index[key]
+            total -= size
+            self.logger.debug('Evicted %s from cache', key)
+
+
+class CacheAdapter(HTTPAdapter):
+    """
+    Transport adapter which serves GET requests from a :class:`HTTPCache`,
+    revalidating stale entries with If-None-Match/If-Modified-Since.
+
+    As the cache can be shared by several browsers (and accounts), requests
+    with an Authorization or a Cookie header are never served from it nor
+    stored, and neither are responses which are private, set cookies or
+    vary on anything. Responses varying on some request headers are only
+    served to requests with the same values of these headers.
+
+    :param cache: storage of responses
+    :type cache: :class:`HTTPCache`
+    :param get_policy: function taking a request and returning its
+                       :class:`CachePolicy`, or None for the default one
+    :type get_policy: :class:`callable`
+    """
+
+    CACHE_CONTROL_RE = re.compile(r'([\w-]+)\s*(?:=\s*"?([^",]*)"?)?')
+
+    def __init__(self, cache, get_policy=None, *args, **kwargs):
+        super(CacheAdapter, self).__init__(*args, **kwargs)
+        self.cache = cache
+        self.get_policy = get_policy
+
+    @classmethod
+    def parse_cache_control(cls, headers):
+        return dict((key.lower(), value) for key, value in cls.CACHE_CONTROL_RE.findall(headers.get('Cache-Control', '')))
+
+    @staticmethod
+    def parse_date(value):
+        if not value:
+            return None
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return mktime_tz(date)
+
+    def freshness(self, headers, policy):
+        """
+        Number of seconds a response is fresh, from the moment it is stored.
+        """
+        if policy.max_age is not None:
+            return policy.max_age
+
+        cc = self.parse_cache_control(headers)
+        if 'no-cache' in cc:
+            return 0
+        if cc.get('max-age', '').isdigit():
+            return int(cc['max-age'])
+
+        expires = self.parse_date(headers.get('Expires'))
+        if expires is not None:
+            date = self.parse_date(headers.get('Date')) or time.time()
+            return max(0, expires - date)
+        return 0
+
+    @staticmethod
+    def is_private(request):
+        return 'Authorization' in request.headers or 'Cookie' in request.headers
+
+    @staticmethod
+    def vary_headers(headers):
+        return sorted(set(name.strip().lower() for name in headers.get('Vary', '').split(',') if name.strip()))
+
+    def is_storable(self, request, response, policy):
+        if not policy.store or response.status_code != 200:
+            return False
+        if self.is_private(request) or 'Set-Cookie' in response.headers:
+            return False
+        if '*' in self.vary_headers(response.headers):
+            return False
+
+        cc = self.parse_cache_control(response.headers)
+        if 'no-store' in cc or 'private' in cc:
+            return False
+
+        # Without freshness nor validator, the entry would never be used.
+        return self.freshness(response.headers, policy) > 0 or \
+            'ETag' in response.headers or 'Last-Modified' in response.headers
+
+    def build_cached_response(self, request, entry):
+        response = Response()
+        response.status_code = entry['status_code']
+        response.reason = entry['reason']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = BytesIO(entry['content'])
+        response._content = entry['content']
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        return response
+
+    def matches(self, request, entry):
+        """
+        Whether a stored entry can be served to a request, according to the
+        Vary header of its response.
+        """
+        return all(request.headers.get(name) == value for name, value in entry.get('vary', {}).iteritems())
+
+    def send(self, request, stream=False, *args, **kwargs):
+        if request.method != 'GET' or stream or self.is_private(request):
+            return super(CacheAdapter, self).send(request, stream, *args, **kwargs)
+
+        policy = (self.get_policy and self.get_policy(request)) or CachePolicy()
+        if not policy.store:
+            return super(CacheAdapter, self).send(request, stream, *args, **kwargs)
+
+        key = self.cache.key(request)
+        entry = self.cache.load(key)
+        if entry is not None and not self.matches(request, entry):
+            entry = None
+        if entry is not None:
+            # Names of headers may have been stored in lower case.
+            entry['headers'] = CaseInsensitiveDict(entry['headers'])
+        if entry is not None:
+            if time.time() < entry['stored_at'] + self.freshness(entry['headers'], policy):
+                self.cache.logger.debug('Serve %s from cache', request.url)
+                return self.build_cached_response(request, entry)
+
+            # Stale entry, ask the server whether it has changed.
+            if 'ETag' in entry['headers']:
+                request.headers['If-None-Match'] = entry['headers']['ETag']
+            if 'Last-Modified' in entry['headers']:
+                request.headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+
+        response = super(CacheAdapter, self).send(request, stream, *args, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            self.cache.logger.debug('Revalidated %s', request.url)
+            response.close()
+            entry['headers'].update((key, value) for key, value in response.headers.iteritems()
+                                    if key.lower() in ('date', 'expires', 'cache-control', 'etag', 'last-modified'))
+            entry['stored_at'] = time.time()
+            self.cache.store(key, dict(entry, headers=dict(entry['headers'])))
+            return self.build_cached_response(request, entry)
+
+        if self.is_storable(request, response, policy):
+            entry = {'status_code': response.status_code,
+                     'reason': response.reason,
+                     'headers': dict(response.headers),
+                     'content': response.content,
+                     'stored_at': time.time(),
+                     'vary': dict((name, request.headers.get(name))
+                                  for name in self.vary_headers(response.headers)),
+                    }
+            self.cache.store(key, entry)
+
+        return response
@@ -16,6 +16,8 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
+import time
+
 import requests.cookies
 try:
     import cookielib
@@ -23,7 +25,7 @@ except ImportError:
     import http.cookiejar as cookielib
 
 
-__all__ = ['WeboobCookieJar']
+__all__ = ['WeboobCookieJar', 'LayeredCookieJar']
 
 
 class WeboobCookieJar(requests.cookies.RequestsCookieJar):
@@ -70,3 +72,70 @@ class WeboobCookieJar(requests.cookies.RequestsCookieJar):
         new_cj = type(self)()
         new_cj.update(self)
         return new_cj
+
+
+class LayeredCookieJar(WeboobCookieJar):
+    """
+    Cookies of a request: cookies given to the request, seen on top of the
+    cookies of the session, which are not copied.
+
+    Cookies set on this jar (for example during redirections) are only
+    stored in this jar.
+
+    :param parent: cookies of the session
+    :type parent: :class:`cookielib.CookieJar`
+    """
+
+    def __init__(self, parent, policy=None):
+        super(LayeredCookieJar, self).__init__(policy or parent._policy)
+        self.parent = parent
+
+    def _local_keys(self):
+        return set((cookie.domain, cookie.path, cookie.name) for cookie in cookielib.deepvalues(self._cookies))
+
+    def _cookies_for_request(self, request):
+        cookies = super(LayeredCookieJar, self)._cookies_for_request(request)
+        local_keys = self._local_keys()
+
+        # Only cookies of the session which match the domain and the path of
+        # the request are looked at.
+        with self.parent._cookies_lock:
+            self.parent._policy._now = self.parent._now = self._now
+            for cookie in self.parent._cookies_for_request(request):
+                if (cookie.domain, cookie.path, cookie.name) not in local_keys:
+                    cookies.append(cookie)
+        return cookies
+
+    def __iter__(self):
+        local_keys = self._local_keys()
+        for cookie in cookielib.deepvalues(self._cookies):
+            yield cookie
+        for cookie in self.parent:
+            if (cookie.domain, cookie.path, cookie.name) not in local_keys:
+                yield cookie
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def clear_expired_cookies(self):
+        # Expired cookies of the session are cleared by the session jar.
+        now = time.time()
+        for cookie in list(cookielib.deepvalues(self._cookies)):
+            if cookie.is_expired(now):
+                self.clear(cookie.domain, cookie.path, cookie.name)
+
+    def update(self, other):
+        if other is self.parent:
+            # Cookies of the session are already seen, but they now take
+            # precedence over the ones of this jar.
+            for cookie in list(cookielib.deepvalues(self._cookies)):
+                if self.parent._cookies.get(cookie.domain, {}).get(cookie.path, {}).get(cookie.name) is not None:
+                    self.clear(cookie.domain, cookie.path, cookie.name)
+            return
+        super(LayeredCookieJar, self).update(other)
+
+    def copy(self):
+        new_cj = type(self)(self.parent, self._policy)
+        for cookie in cookielib.deepvalues(self._cookies):
+            new_cj.set_cookie(cookie)
+        return new_cj
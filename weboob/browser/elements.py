@@ -19,10 +19,15 @@
 
 import re
 import sys
+import datetime
+from collections import MutableMapping
 from copy import deepcopy
+from decimal import Decimal
+from functools import partial
 
 from weboob.tools.log import getLogger, DEBUG_FILTERS
 from weboob.tools.ordereddict import OrderedDict
+from weboob.tools.xpath import xpath, cssselect
 from weboob.browser.pages import NextPage
 
 from .filters.standard import _Filter, CleanText
@@ -48,7 +53,89 @@ def method(klass):
     return inner
 
 
+# Values which can be shared between environments without being copied.
+_IMMUTABLE_TYPES = frozenset([type(None), bool, int, long, float, Decimal, str, unicode,
+                              datetime.date, datetime.datetime, datetime.time])
+
+
+class _ChainEnv(MutableMapping):
+    """
+    Environment of an element, seen through the environment of its parent.
+
+    Keys set on the element are stored locally, so they are not seen by the
+    parent. As with a copy of the parent environment, mutable values are
+    copied the first time they are read from the parent, so an element can
+    change them without side-effect on other elements.
+
+    :param parent: environment of the parent element, or page parameters
+    :type parent: :class:`dict`
+    """
+
+    def __init__(self, parent=None):
+        self.parent = parent if parent is not None else {}
+        self.data = {}
+        self.deleted = set()
+
+    def __getitem__(self, key):
+        try:
+            return self.data[key]
+        except KeyError:
+            if key in self.deleted:
+                raise
+        value = self.parent[key]
+        if type(value) not in _IMMUTABLE_TYPES:
+            value = self.data[key] = deepcopy(value)
+        return value
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.data.pop(key, None)
+        self.deleted.add(key)
+
+    def __contains__(self, key):
+        return key in self.data or (key not in self.deleted and key in self.parent)
+
+    def __iter__(self):
+        for key in self.data:
+            yield key
+        for key in self.parent:
+            if key not in self.data and key not in self.deleted:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self.iteritems()))
+
+
+class _ElementMeta(type):
+    """
+    Private meta-class used to find, once per class, the nested elements and
+    the loaders of an element.
+    """
+    def __new__(mcs, name, bases, attrs):
+        new_class = super(_ElementMeta, mcs).__new__(mcs, name, bases, attrs)
+
+        new_class._item_classes = []
+        new_class._loaders_names = []
+        for attrname in dir(new_class):
+            if attrname.startswith('load_'):
+                new_class._loaders_names.append((attrname[len('load_'):], attrname))
+            attr = getattr(new_class, attrname)
+            if isinstance(attr, _ElementMeta) and attr is not new_class:
+                new_class._item_classes.append(attr)
+        return new_class
+
+
 class AbstractElement(object):
+    __metaclass__ = _ElementMeta
+
     _creation_counter = 0
 
     def __init__(self, page, parent=None, el=None):
@@ -62,9 +149,9 @@ class AbstractElement(object):
             self.el = page.doc
 
         if parent is not None:
-            self.env = deepcopy(parent.env)
+            self.env = _ChainEnv(parent.env)
         else:
-            self.env = deepcopy(page.params)
+            self.env = _ChainEnv(page.params)
 
         # Used by debug
         self._random_id = AbstractElement._creation_counter
@@ -74,9 +161,7 @@ class AbstractElement(object):
 
     def use_selector(self, func, key=None):
         if isinstance(func, _Filter):
-            func._obj = self
-            func._key = key
-            value = func(self)
+            value = func.evaluate(self, key)
         elif isinstance(func, type) and issubclass(func, ItemElement):
             value = func(self.page, self, self.el)()
         elif callable(func):
@@ -90,17 +175,15 @@ class AbstractElement(object):
         pass
 
     def cssselect(self, *args, **kwargs):
-        return self.el.cssselect(*args, **kwargs)
+        return cssselect(self.el, *args, **kwargs)
 
     def xpath(self, *args, **kwargs):
-        return self.el.xpath(*args, **kwargs)
+        if 'extensions' in kwargs or 'smart_strings' in kwargs or 'regexp' in kwargs:
+            return self.el.xpath(*args, **kwargs)
+        return xpath(self.el, *args, **kwargs)
 
     def handle_loaders(self):
-        for attrname in dir(self):
-            m = re.match('load_(.*)', attrname)
-            if not m:
-                continue
-            name = m.group(1)
+        for name, attrname in self._loaders_names:
             if name in self.loaders:
                 continue
             loader = getattr(self, attrname)
@@ -112,10 +195,24 @@ class ListElement(AbstractElement):
     flush_at_end = False
     ignore_duplicate = False
 
+    streaming = False
+    """
+    If True, each item is built, evaluated and yielded before the next one
+    is built, instead of building every item (and running its loaders)
+    first. Unless :attr:`flush_at_end` is set, objects are not kept in
+    :attr:`objects`, and duplicates are detected with their IDs only.
+
+    Do not use it when loaders should run for all items before they are
+    evaluated (like :class:`weboob.browser.filters.standard.AsyncLoad`), or
+    when items read ``self.parent.objects``.
+    """
+
     def __init__(self, *args, **kwargs):
         super(ListElement, self).__init__(*args, **kwargs)
         self.logger = getLogger(self.__class__.__name__.lower())
         self.objects = OrderedDict()
+        # IDs of objects which are not kept, in streaming mode
+        self.ids = set()
 
     def __call__(self, *args, **kwargs):
         for key, value in kwargs.iteritems():
@@ -130,22 +227,19 @@ class ListElement(AbstractElement):
         sufficient.
         """
         if self.item_xpath is not None:
-            for el in self.el.xpath(self.item_xpath):
+            for el in xpath(self.el, self.item_xpath):
                 yield el
         else:
             yield self.el
 
     def __iter__(self):
         self.parse(self.el)
+        self.announce_next_page()
 
-        items = []
-        for el in self.find_elements():
-            for attrname in dir(self):
-                attr = getattr(self, attrname)
-                if isinstance(attr, type) and issubclass(attr, AbstractElement) and attr != type(self):
-                    item = attr(self.page, self, el)
-                    item.handle_loaders()
-                    items.append(item)
+        if self.streaming:
+            items = self.iter_items()
+        else:
+            items = list(self.iter_items())
 
         for item in items:
             for obj in item:
@@ -159,35 +253,88 @@ class ListElement(AbstractElement):
 
         self.check_next_page()
 
+    def iter_items(self):
+        """
+        Build item elements of nodes, and run their loaders.
+        """
+        for el in self.find_elements():
+            for klass in self._item_classes:
+                item = klass(self.page, self, el)
+                item.handle_loaders()
+                yield item
+
     def flush(self):
         for obj in self.objects.itervalues():
             yield obj
 
-    def check_next_page(self):
+    def get_next_page(self):
+        """
+        Get the value of ``next_page``, or None if there is no next page.
+        """
         if not hasattr(self, 'next_page'):
-            return
+            return None
 
         next_page = getattr(self, 'next_page')
         try:
-            value = self.use_selector(next_page)
+            return self.use_selector(next_page)
         except (AttributeNotFound, XPathNotFound):
+            return None
+
+    def check_next_page(self):
+        value = self.get_next_page()
+        if value is not None:
+            raise NextPage(value)
+
+    def announce_next_page(self):
+        """
+        Give the next page to the prefetcher of
+        :meth:`weboob.browser.browsers.PagesBrowser.pagination`, if any, so
+        it is fetched while items are processed.
+
+        It is only done when ``next_page`` is a filter, as a method could
+        depend on processed items.
+        """
+        if self.parent is not None or self.page is None or \
+           not isinstance(getattr(self, 'next_page', None), _Filter):
             return
 
-        if value is None:
+        # Elements can be built on objects which are not pages of a browser.
+        browser = getattr(self.page, 'browser', None)
+        prefetcher = getattr(browser, 'prefetcher', None)
+        if prefetcher is None or browser.page is not self.page:
             return
 
-        raise NextPage(value)
+        try:
+            value = self.get_next_page()
+        except Exception as e:
+            # It is raised again by check_next_page(), after items.
+            self.logger.debug('Unable to prefetch the next page: %r', e)
+            return
+        if value is not None:
+            prefetcher.announce(value, partial(self._resolve_next_page, dict(self.env.data)))
 
+    @classmethod
+    def _resolve_next_page(cls, env, page):
+        """
+        Get the next page of a page fetched in background, with the
+        environment of the current element.
+        """
+        element = cls(page)
+        element.env.update(env)
+        return element.get_next_page()
 
     def store(self, obj):
         if obj.id:
-            if obj.id in self.objects:
+            if obj.id in self.objects or obj.id in self.ids:
                 if self.ignore_duplicate:
                     self.logger.warning('There are two objects with the same ID! %s' % obj.id)
                     return
                 else:
                     raise DataError('There are two objects with the same ID! %s' % obj.id)
-            self.objects[obj.id] = obj
+            if self.streaming and not self.flush_at_end:
+                self.ids.add(obj.id)
+            else:
+                self.objects[obj.id] = obj
         return obj
 
 
@@ -197,7 +344,7 @@ class SkipItem(Exception):
     """
 
 
-class _ItemElementMeta(type):
+class _ItemElementMeta(_ElementMeta):
     """
     Private meta-class used to keep order of obj_* attributes in :class:`ItemElement`.
     """
@@ -225,6 +372,12 @@ class ItemElement(AbstractElement):
     condition = None
     validate = None
 
+    compile_filters = False
+    """
+    If True, obj_* attributes are compiled once per class by :func:`get_plan`,
+    unless DEBUG_FILTERS is enabled.
+    """
+
     class Index(object):
         pass
 
@@ -254,8 +407,13 @@ class ItemElement(AbstractElement):
                 self.obj = self.build_object()
             self.parse(self.el)
             self.handle_loaders()
-            for attr in self._attrs:
-                self.handle_attr(attr, getattr(self, 'obj_%s' % attr))
+            plan = self.get_plan()
+            if plan is None:
+                for attr in self._attrs:
+                    self.handle_attr(attr, getattr(self, 'obj_%s' % attr))
+            else:
+                for attr, evaluate in plan:
+                    self.handle_compiled_attr(attr, evaluate)
         except SkipItem:
             return
 
@@ -272,9 +430,51 @@ class ItemElement(AbstractElement):
             self.logger.warning('Attribute %s raises %s' % (key, repr(e)))
             raise
         logger = getLogger('b2filters')
-        logger.log(DEBUG_FILTERS, "%s.%s = %r" % (self._random_id, key, value))
+        if logger.isEnabledFor(DEBUG_FILTERS):
+            logger.log(DEBUG_FILTERS, "%s.%s = %r" % (self._random_id, key, value))
+        setattr(self.obj, key, value)
+
+    def handle_compiled_attr(self, key, evaluate):
+        # Same as handle_attr(), for plans which are only used when
+        # DEBUG_FILTERS is disabled.
+        try:
+            value = evaluate(self)
+        except Exception as e:
+            self.logger.warning('Attribute %s raises %s' % (key, repr(e)))
+            raise
         setattr(self.obj, key, value)
 
+    @classmethod
+    def get_plan(cls):
+        """
+        Get the list of (attribute name, function) evaluated to fill objects,
+        or None if this class is not compiled.
+
+        Functions take the item as parameter. The list is built once per
+        class, and does not keep any state between calls.
+        """
+        if not cls.compile_filters or cls.xpath.im_func is not AbstractElement.xpath.im_func or \
+           getLogger('b2filters').isEnabledFor(DEBUG_FILTERS):
+            return None
+
+        plan = cls.__dict__.get('_plan')
+        if plan is None:
+            plan = [(attr, cls.compile_attr(attr, getattr(cls, 'obj_%s' % attr))) for attr in cls._attrs]
+            cls._plan = plan
+        return plan
+
+    @classmethod
+    def compile_attr(cls, key, func):
+        if isinstance(func, _Filter):
+            return func.compile(key)
+        elif isinstance(func, type) and issubclass(func, ItemElement):
+            return lambda item: func(item.page, item, item.el)()
+        elif callable(func):
+            attrname = 'obj_%s' % key
+            return lambda item: getattr(item, attrname)()
+        else:
+            return lambda item: deepcopy(func)
+
 
 class TableElement(ListElement):
     head_xpath = None
@@ -284,6 +484,8 @@ class TableElement(ListElement):
         super(TableElement, self).__init__(*args, **kwargs)
 
         self._cols = {}
+        # Compiled selectors of cells, used by compiled TableCell filters
+        self._cells = {}
 
         columns = {}
         for attrname in dir(self):
@@ -295,7 +497,7 @@ class TableElement(ListElement):
                 columns[m.group(1)] = [s.lower() for s in cols]
 
         colnum = 0
-        for el in self.el.xpath(self.head_xpath):
+        for el in xpath(self.el, self.head_xpath):
             title = self.cleaner.clean(el).lower()
             for name, titles in columns.iteritems():
                 if title in titles and name not in self._cols:
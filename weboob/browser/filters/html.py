@@ -21,6 +21,7 @@
 import lxml.html as html
 from .standard import _Selector, _NO_DEFAULT, Filter, FilterError
 from weboob.tools.html import html2text
+from weboob.tools.xpath import cssselect
 
 
 __all__ = ['CSS', 'XPath', 'XPathNotFound', 'AttributeNotFound',
@@ -38,6 +39,8 @@ class AttributeNotFound(FilterError):
 class CSS(_Selector):
     @classmethod
     def select(cls, selector, item, obj=None, key=None):
+        if isinstance(item, (html.etree._Element, html.etree._ElementTree)):
+            return cssselect(item, selector)
         return item.cssselect(selector)
 
 
@@ -70,8 +70,6 @@ class Dict(Filter):
             if isinstance(content, list):
                 el = int(el)
             elif isinstance(el, _Filter):
-                el._key = key
-                el._obj = obj
                 el = el(item)
             elif callable(el):
                 el = el(item)
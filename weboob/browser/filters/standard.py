@@ -25,14 +25,17 @@ import unicodedata
 from decimal import Decimal, InvalidOperation
 from itertools import islice
 from collections import Iterator
+from threading import local
 
 from dateutil.parser import parse as parse_date
+from lxml import etree
 
 from weboob.capabilities.base import empty
 from weboob.tools.compat import basestring
 from weboob.exceptions import ParseError
 from weboob.browser.url import URL
 from weboob.tools.log import getLogger, DEBUG_FILTERS
+from weboob.tools.xpath import xpath, xpath_cache
 
 
 class NoDefault(object):
@@ -66,12 +69,29 @@ class ItemNotFound(FilterError):
     pass
 
 
+class _FilterContext(local):
+    """
+    Stack of (element, attribute) being filled in the current thread.
+
+    Filters are shared by every element of a class, and possibly by several
+    threads, so they never store this context. It is only used by debug
+    messages.
+    """
+
+    def __init__(self):
+        self.stack = []
+
+    @property
+    def key(self):
+        return self.stack[-1][1] if self.stack else None
+
+_context = _FilterContext()
+
+
 class _Filter(object):
     _creation_counter = 0
 
     def __init__(self, default=_NO_DEFAULT):
-        self._key = None
-        self._obj = None
         self.default = default
         self._creation_counter = _Filter._creation_counter
         _Filter._creation_counter += 1
@@ -95,6 +115,36 @@ class _Filter(object):
     def __str__(self):
         return self.__class__.__name__
 
+    def compile(self, key=None):
+        """
+        Get a function taking an element, and returning the same value than
+        calling this filter on it.
+
+        Subclasses can return a faster function. This one only calls the
+        filter.
+
+        :param key: name of the attribute filled by this filter
+        :rtype: :class:`callable`
+        """
+        return lambda item: self.evaluate(item, key)
+
+    def evaluate(self, item, key=None):
+        """
+        Call the filter on an element, to fill its attribute `key`.
+
+        :param item: element
+        :type item: :class:`weboob.browser.elements.AbstractElement`
+        :param key: name of the attribute filled by this filter
+        """
+        if not getLogger('b2filters').isEnabledFor(DEBUG_FILTERS):
+            return self(item)
+
+        _context.stack.append((item, key))
+        try:
+            return self(item)
+        finally:
+            _context.stack.pop()
+
 
 def debug(*args):
     """
@@ -105,6 +155,9 @@ def debug(*args):
     def wraper(function):
         def print_debug(self, value):
             logger = getLogger('b2filters')
+            if not logger.isEnabledFor(DEBUG_FILTERS):
+                return function(self, value)
+
             result = ''
             outputvalue = value
             if isinstance(value, list):
@@ -120,10 +173,11 @@ def debug(*args):
                         outputvalue += "%s" % etree.tostring(element, encoding=unicode)
                     else:
                         outputvalue += "%r" % element
-            if self._obj is not None:
-                result += "%s" % self._obj._random_id
-            if self._key is not None:
-                result += ".%s" % self._key
+            if _context.stack:
+                obj, key = _context.stack[-1]
+                result += "%s" % getattr(obj, '_random_id', '')
+                if key is not None:
+                    result += ".%s" % key
             name = str(self)
             result += " %s(%r" % (name, outputvalue)
             for arg in self.__dict__:
@@ -136,6 +190,8 @@ def debug(*args):
             logger.log(DEBUG_FILTERS, result)
             res = function(self, value)
             return res
+        # Used by compiled filters when debug is disabled.
+        print_debug.undecorated = function
         return print_debug
     return wraper
 
@@ -160,11 +216,12 @@ class Filter(_Filter):
 
     @classmethod
     def select(cls, selector, item, obj=None, key=None):
+        # obj and key are not used anymore, they are kept for compatibility.
         if isinstance(selector, basestring):
+            if isinstance(item, (etree._Element, etree._ElementTree)):
+                return xpath(item, selector)
             return item.xpath(selector)
         elif isinstance(selector, _Filter):
-            selector._key = key
-            selector._obj = obj
             return selector(item)
         elif callable(selector):
             return selector(item)
@@ -172,7 +229,50 @@ class Filter(_Filter):
             return selector
 
     def __call__(self, item):
-        return self.filter(self.select(self.selector, item, key=self._key, obj=self._obj))
+        return self.filter(self.select(self.selector, item))
+
+    @classmethod
+    def compile_selector(cls, selector, key=None):
+        """
+        Get a function taking an element, and returning the same value than
+        :func:`select`.
+        """
+        if isinstance(selector, basestring):
+            try:
+                compiled = xpath_cache.get_xpath(selector)
+            except etree.XPathSyntaxError:
+                # Raise the error when the filter is called, as usual.
+                return lambda item: item.xpath(selector)
+            return lambda item: compiled(item.el)
+        elif isinstance(selector, _Filter):
+            return selector.compile(key)
+        elif callable(selector):
+            return selector
+        else:
+            return lambda item: selector
+
+    def compile(self, key=None):
+        """
+        Get a function taking an :class:`weboob.browser.elements.ItemElement`,
+        and returning the same value than calling this filter on it.
+
+        XPath selectors are compiled, and unless DEBUG_FILTERS is enabled,
+        :func:`filter` is called without debug.
+        """
+        cls = type(self)
+        if cls.__call__.im_func is not Filter.__call__.im_func or \
+           cls.select.im_func is not Filter.select.im_func:
+            return super(Filter, self).compile(key)
+
+        select = self.compile_selector(self.selector, key)
+        filter = self._compiled_filter()
+        return lambda item: filter(select(item))
+
+    def _compiled_filter(self):
+        function = type(self).filter.im_func
+        if hasattr(function, 'undecorated') and not getLogger('b2filters').isEnabledFor(DEBUG_FILTERS):
+            function = function.undecorated
+        return function.__get__(self, type(self))
 
     @debug()
     def filter(self, value):
@@ -192,7 +292,7 @@ class _Selector(Filter):
 
 class AsyncLoad(Filter):
     def __call__(self, item):
-        link = self.select(self.selector, item, key=self._key, obj=self._obj)
+        link = self.select(self.selector, item)
         return item.page.browser.async_open(link) if link else None
 
 
@@ -225,7 +325,7 @@ class Base(Filter):
     """
 
     def __call__(self, item):
-        base = self.select(self.base, item, obj=self._obj, key=self._key)
+        base = self.select(self.base, item)
         return self.selector(base)
 
     def __init__(self, base, selector=None, default=_NO_DEFAULT):
@@ -242,14 +342,18 @@ class Decode(Filter):
 
     """
     def __call__(self, item):
-        self.encoding = item.page.ENCODING if item.page.ENCODING else 'utf-8'
-        return self.filter(self.select(self.selector, item, key=self._key, obj=self._obj))
+        encoding = item.page.ENCODING if item.page.ENCODING else 'utf-8'
+        return self.decode(self.select(self.selector, item), encoding)
 
     @debug()
     def filter(self, txt):
+        return self.decode(txt, 'utf-8')
+
+    @staticmethod
+    def decode(txt, encoding):
         from urllib import unquote
         try:
-            txt = unquote(txt.encode('ascii')).decode(self.encoding)
+            txt = unquote(txt.encode('ascii')).decode(encoding)
         except (UnicodeDecodeError, UnicodeEncodeError):
             pass
 
@@ -307,6 +411,40 @@ class TableCell(_Filter):
 
         return self.default_or_raise(ColumnNotFound('Unable to find column %s' % ' or '.join(self.names)))
 
+    def compile(self, key=None):
+        """
+        Get a function which looks for the column once per table, and then
+        selects the cell with a compiled XPath.
+        """
+        if type(self).__call__.im_func is not TableCell.__call__.im_func:
+            return super(TableCell, self).compile(key)
+
+        names = self.names
+
+        def cell(item):
+            table = item.parent
+            try:
+                cells = table._cells
+            except AttributeError:
+                # Not a TableElement, its columns may change.
+                return self(item)
+
+            try:
+                select = cells[names]
+            except KeyError:
+                select = None
+                for name in names:
+                    idx = table.get_colnum(name)
+                    if idx is not None:
+                        select = xpath_cache.get_xpath('./td[%s]' % (idx + 1))
+                        break
+                cells[names] = select
+
+            if select is None:
+                return self.default_or_raise(ColumnNotFound('Unable to find column %s' % ' or '.join(names)))
+            return select(item.el)
+        return cell
+
 
 class RawText(Filter):
     @debug()
@@ -505,7 +643,7 @@ class Field(_Filter):
         self.name = name
 
     def __call__(self, item):
-        return item.use_selector(getattr(item, 'obj_%s' % self.name), key=self._key)
+        return item.use_selector(getattr(item, 'obj_%s' % self.name), key=_context.key)
 
 
 # Based on nth from https://docs.python.org/2/library/itertools.html
@@ -628,11 +766,11 @@ class DateGuesser(Filter):
         self.kwargs = kwargs
 
     def __call__(self, item):
-        values = self.select(self.selector, item, obj=self._obj, key=self._key)
+        values = self.select(self.selector, item)
         date_guesser = self.date_guesser
         # In case Env() is used to kive date_guesser.
         if isinstance(date_guesser, _Filter):
-            date_guesser = self.select(date_guesser, item, obj=self._obj, key=self._key)
+            date_guesser = self.select(date_guesser, item)
 
         if isinstance(values, basestring):
             values = re.split('[/-]', values)
@@ -675,9 +813,19 @@ class MultiFilter(Filter):
         super(MultiFilter, self).__init__(args, default)
 
     def __call__(self, item):
-        values = [self.select(selector, item, obj=self._obj, key=self._key) for selector in self.selector]
+        values = [self.select(selector, item) for selector in self.selector]
         return self.filter(tuple(values))
 
+    def compile(self, key=None):
+        cls = type(self)
+        if cls.__call__.im_func is not MultiFilter.__call__.im_func or \
+           cls.select.im_func is not Filter.select.im_func:
+            return _Filter.compile(self, key)
+
+        selects = [self.compile_selector(selector, key) for selector in self.selector]
+        filter = self._compiled_filter()
+        return lambda item: filter(tuple([select(item) for select in selects]))
+
     def filter(self, values):
         raise NotImplementedError()
 
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import socket
+import ssl
+from threading import Lock
+
+try:
+    from hyper import HTTPConnection, HTTP20Connection
+    from hyper.common.exceptions import SocketError
+    from hyper.contrib import HTTP20Adapter
+    from hyper.http11.parser import ParseError
+    from hyper.http20.exceptions import ConnectionError as HTTP20ConnectionError, ProtocolError, StreamResetError
+    from hyper.tls import init_context
+except ImportError:
+    raise ImportError('Please install python-hyper')
+
+from requests.exceptions import ConnectionError, ReadTimeout, SSLError
+from requests.utils import prepend_scheme_if_needed
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+from .adapters import select_proxy
+from .retry import RetryPolicy
+
+
+__all__ = ['HTTP2Adapter']
+
+
+class HTTP2Adapter(HTTP20Adapter):
+    """
+    Transport adapter which sends requests with HTTP/2, using python-hyper.
+
+    Concurrent requests to a host share a single connection, on which they
+    are multiplexed. Servers which do not negotiate HTTP/2 are requested
+    with HTTP/1.1 on this connection, one request at a time.
+
+    The read timeout is applied to the socket of the connection. Connecting
+    times out after 5 seconds, as hyper does.
+
+    :param max_retries: number of times an idempotent request is sent again
+                        on a new connection, when it fails before being
+                        sent entirely, for example because the server closed
+                        the connection
+    :type max_retries: :class:`int`
+    """
+
+    def __init__(self, max_retries=0):
+        super(HTTP2Adapter, self).__init__()
+        self.max_retries = max_retries
+        self.lock = Lock()
+        # connection -> lock serializing its requests while it is not HTTP/2
+        self.locks = {}
+
+    def get_connection(self, host, port, scheme, cert=None, verify=True, proxy=None):
+        key = (host, port, scheme, cert, verify, proxy)
+        with self.lock:
+            try:
+                return self.connections[key]
+            except KeyError:
+                pass
+
+            secure = (scheme == 'https')
+            context = None
+            if secure and (cert is not None or verify is not True):
+                context = init_context(cert_path=verify if isinstance(verify, basestring) else None, cert=cert)
+                if not verify:
+                    context.check_hostname = False
+                    context.verify_mode = ssl.CERT_NONE
+
+            proxy_host = proxy_port = None
+            if proxy is not None:
+                proxy = urlparse(proxy)
+                proxy_host, proxy_port = proxy.hostname, proxy.port
+
+            conn = self.connections[key] = HTTPConnection(host, port, secure=secure, ssl_context=context,
+                                                          proxy_host=proxy_host, proxy_port=proxy_port)
+            self.locks[conn] = Lock()
+            return conn
+
+    def drop_connection(self, conn):
+        """
+        Close a connection which failed, so the next requests open another
+        one.
+        """
+        with self.lock:
+            for key, value in self.connections.items():
+                if value is conn:
+                    del self.connections[key]
+            self.locks.pop(conn, None)
+        self._close(conn)
+
+    @staticmethod
+    def is_http2(conn):
+        return isinstance(conn._conn, HTTP20Connection)
+
+    @staticmethod
+    def set_timeout(conn, timeout):
+        # The socket only exists once connected.
+        sock = getattr(conn._conn, '_sock', None)
+        if sock is not None:
+            sock._sck.settimeout(timeout)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if isinstance(cert, list):
+            cert = tuple(cert)
+        if isinstance(timeout, tuple):
+            # (connect, read)
+            timeout = timeout[1]
+        proxy = select_proxy(request.url, proxies)
+        if proxy:
+            proxy = prepend_scheme_if_needed(proxy, 'http')
+
+        parsed = urlparse(request.url)
+        selector = parsed.path or '/'
+        if parsed.query:
+            selector += '?' + parsed.query
+
+        retries = self.max_retries if request.method in RetryPolicy.IDEMPOTENT_METHODS else 0
+        while True:
+            conn = self.get_connection(parsed.hostname, parsed.port, parsed.scheme, cert, verify, proxy)
+            try:
+                return self._send(conn, request, selector, stream, timeout)
+            except _SendError as e:
+                # The request has not been sent, it can be sent again,
+                # unless the server is not trusted.
+                if retries <= 0 or isinstance(e.error, SSLError):
+                    raise e.error
+                retries -= 1
+
+    def _send(self, conn, request, selector, stream, timeout):
+        lock = self.locks.get(conn) or Lock()
+        # Until HTTP/2 is negotiated, requests can't be multiplexed.
+        locked = not self.is_http2(conn)
+        if locked:
+            lock.acquire()
+        try:
+            try:
+                self.set_timeout(conn, timeout)
+                stream_id = conn.request(request.method, selector, request.body, request.headers)
+            except Exception as e:
+                self.drop_connection(conn)
+                raise _SendError(self._convert_error(e, request))
+            self.set_timeout(conn, timeout)
+
+            if locked and self.is_http2(conn):
+                locked = False
+                lock.release()
+
+            try:
+                # Take the response of this request, and not of another one
+                # sent concurrently on the same connection.
+                if stream_id is not None:
+                    resp = conn.get_response(stream_id)
+                else:
+                    resp = conn.get_response()
+
+                response = self.build_response(request, resp)
+                if not stream or locked:
+                    # With HTTP/1.1, the body has to be read before the
+                    # next request is sent.
+                    response.content
+            except StreamResetError:
+                raise
+            except Exception as e:
+                self.drop_connection(conn)
+                raise self._convert_error(e, request)
+            return response
+        finally:
+            if locked:
+                lock.release()
+
+    @staticmethod
+    def _convert_error(error, request):
+        """
+        Get the exception requests would raise for an error of hyper.
+        """
+        # Python 2 reports timeouts of TLS sockets with SSLError.
+        if isinstance(error, socket.timeout) or \
+           (isinstance(error, ssl.SSLError) and 'timed out' in str(error)):
+            return ReadTimeout(error, request=request)
+        if isinstance(error, ssl.SSLError):
+            return SSLError(error, request=request)
+        if isinstance(error, (socket.error, SocketError, HTTP20ConnectionError, ProtocolError, ParseError)):
+            return ConnectionError(error, request=request)
+        return error
+
+    def build_response(self, request, resp):
+        response = super(HTTP2Adapter, self).build_response(request, resp)
+        # hyper gives headers with a generator, which would be consumed by
+        # the first lookup of cookies.
+        response.raw._original_response.msg._headers = list(resp.headers.iter_raw())
+        return response
+
+    def close(self):
+        with self.lock:
+            for conn in self.connections.itervalues():
+                self._close(conn)
+            self.connections.clear()
+            self.locks.clear()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except AttributeError:
+            # hyper fails to close a connection which never connected.
+            pass
+        except Exception:
+            # The connection is already broken.
+            pass
+
+
+class _SendError(Exception):
+    # Raised by HTTP2Adapter._send() when a request fails before being
+    # sent entirely.
+    def __init__(self, error):
+        super(_SendError, self).__init__(error)
+        self.error = error
@@ -31,6 +31,7 @@ from weboob.tools.ordereddict import OrderedDict
 from weboob.tools.compat import basestring
 
 from weboob.tools.log import getLogger
+from weboob.tools.xpath import xpath_cache
 
 
 def pagination(func):
@@ -252,7 +253,7 @@ class Form(OrderedDict):
         submits = 0
 
         # Find all elements of the form that will be useful to create the request
-        for inp in el.xpath('.//input | .//select | .//textarea'):
+        for inp in xpath_cache.get_xpath('.//input | .//select | .//textarea')(el):
             # Step 1: Ignore some elements
             try:
                 name = inp.attrib['name']
@@ -498,7 +499,7 @@ class HTMLPage(Page):
         if self.REFRESH_MAX is None:
             return
 
-        for refresh in self.doc.xpath('//head/meta[@http-equiv="Refresh"]'):
+        for refresh in xpath_cache.get_xpath('//head/meta[@http-equiv="Refresh"]')(self.doc):
             m = self.browser.REFRESH_RE.match(refresh.get('content', ''))
             if not m:
                 continue
@@ -549,7 +550,7 @@ class HTMLPage(Page):
             """
             expressions = ' and '.join(["contains(concat(' ', normalize-space(@class), ' '), ' {0} ')".format(c) for c in classes])
             xpath = 'self::*[@class and {0}]'.format(expressions)
-            return bool(context.context_node.xpath(xpath))
+            return bool(xpath_cache.get_xpath(xpath)(context.context_node))
         ns['has-class'] = has_class
 
     def build_doc(self, content):
@@ -565,13 +566,13 @@ class HTMLPage(Page):
         Look for encoding in the document "http-equiv" and "charset" meta nodes.
         """
         encoding = self.encoding
-        for content in self.doc.xpath('//head/meta[lower-case(@http-equiv)="content-type"]/@content'):
+        for content in xpath_cache.get_xpath('//head/meta[lower-case(@http-equiv)="content-type"]/@content')(self.doc):
             # meta http-equiv=content-type content=...
             _, params = parse_header(content)
             if 'charset' in params:
                 encoding = params['charset'].strip("'\"")
 
-        for charset in self.doc.xpath('//head/meta[@charset]/@charset'):
+        for charset in xpath_cache.get_xpath('//head/meta[@charset]/@charset')(self.doc):
             # meta charset=...
             encoding = charset.lower()
 
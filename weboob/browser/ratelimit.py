@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_tz, mktime_tz
+from threading import Lock, Semaphore, local
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+from weboob.tools.log import getLogger
+
+
+__all__ = ['HostLimiter', 'RateLimiter']
+
+
+class HostLimiter(object):
+    """
+    Token bucket and concurrency limit of requests to a host.
+
+    The rate is halved each time the server answers 429 or 503, and is then
+    recovered step by step. Requests are also paused for the time given by
+    the Retry-After header, or for an exponential delay.
+
+    :param rate: requests per second, or None for no limit
+    :type rate: :class:`float`
+    :param burst: number of requests which can be sent at once after an
+                  idle period
+    :type burst: :class:`int`
+    :param max_concurrency: maximum number of requests at the same time, or
+                            None for no limit
+    :type max_concurrency: :class:`int`
+    """
+
+    THROTTLE_CODES = (429, 503)
+
+    MAX_DELAY = 300
+    """
+    Maximum pause in seconds, whatever the server says.
+    """
+
+    def __init__(self, rate=None, burst=1, max_concurrency=None, logger=None):
+        self.logger = logger or getLogger('ratelimit')
+        self.base_rate = self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.time()
+        self.paused_until = 0
+        self.delay = 0
+        self.lock = Lock()
+        self.semaphore = Semaphore(max_concurrency) if max_concurrency else None
+
+    def acquire(self, concurrent=True):
+        """
+        Wait until a request can be sent.
+
+        :param concurrent: also take a place of :attr:`max_concurrency`
+        :type concurrent: :class:`bool`
+        """
+        if concurrent and self.semaphore is not None:
+            self.semaphore.acquire()
+
+        while True:
+            with self.lock:
+                now = time.time()
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.rate is None:
+                        return
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def release(self, concurrent=True):
+        if concurrent and self.semaphore is not None:
+            self.semaphore.release()
+
+    def feedback(self, response):
+        """
+        Adapt the limits to the response of the server.
+        """
+        with self.lock:
+            if response.status_code not in self.THROTTLE_CODES:
+                self.delay = 0
+                if self.rate is not None and self.rate < self.base_rate:
+                    self.rate = min(self.base_rate, self.rate + self.base_rate / 10.)
+                return
+
+            delay = self.parse_retry_after(response.headers.get('Retry-After'))
+            if delay is None:
+                delay = min(self.MAX_DELAY, max(1, 2 * self.delay))
+            self.delay = delay = min(self.MAX_DELAY, delay)
+            self.paused_until = max(self.paused_until, time.time() + delay)
+            if self.rate is not None:
+                self.rate = max(self.base_rate / 16., self.rate / 2.)
+                self.tokens = min(self.tokens, 0)
+        self.logger.warning('%s answered %s, pausing requests for %ds', urlparse(response.url).netloc,
+                            response.status_code, delay)
+
+    @staticmethod
+    def parse_retry_after(value):
+        """
+        Get the number of seconds of a Retry-After header.
+
+        >>> HostLimiter.parse_retry_after('120')
+        120
+        >>> HostLimiter.parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT')
+        0
+        >>> HostLimiter.parse_retry_after('soon')
+        """
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return int(value)
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0, int(mktime_tz(date) - time.time()))
+
+
+class RateLimiter(object):
+    """
+    Limits of requests of a browser, with a :class:`HostLimiter` for each
+    host.
+
+    Use :func:`get` to share limits between every browser of the same class.
+    """
+    _instances = {}
+    _instances_lock = Lock()
+
+    @classmethod
+    def get(cls, key, *args, **kwargs):
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(*args, **kwargs)
+            return cls._instances[key]
+
+    def __init__(self, rate=None, burst=1, max_concurrency=None):
+        self.logger = getLogger('ratelimit')
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.hosts = {}
+        self.lock = Lock()
+        # Hosts of requests being sent by each thread, as redirections are
+        # sent while the first request still holds its place.
+        self.current = local()
+
+    def get_host(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            try:
+                return self.hosts[host]
+            except KeyError:
+                limiter = self.hosts[host] = HostLimiter(self.rate, self.burst, self.max_concurrency, self.logger)
+                return limiter
+
+    @contextmanager
+    def limit(self, request):
+        """
+        Context manager which waits until a request can be sent. It gives
+        the :class:`HostLimiter`, to call its :func:`HostLimiter.feedback`
+        method with the response.
+        """
+        limiter = self.get_host(request.url)
+        hosts = self.current.__dict__.setdefault('hosts', [])
+        concurrent = limiter not in hosts
+
+        limiter.acquire(concurrent)
+        hosts.append(limiter)
+        try:
+            yield limiter
+        finally:
+            hosts.pop()
+            limiter.release(concurrent)
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import heapq
+import random
+import time
+from itertools import count
+from threading import Condition, Lock, Thread
+
+from requests.exceptions import ConnectionError, ConnectTimeout, Timeout
+try:
+    from concurrent.futures import Future
+except ImportError:
+    Future = None
+
+from weboob.tools.log import getLogger
+
+from .ratelimit import HostLimiter
+
+
+__all__ = ['RetryPolicy', 'RetryMetrics', 'RetryRequest']
+
+
+class RetryPolicy(object):
+    """
+    Which requests are sent again, and when.
+
+    Delays grow exponentially, with a random jitter so that clients do not
+    retry all at once, and are at least the Retry-After delay given by the
+    server.
+
+    Only idempotent requests are sent again after a response or a read
+    error, as the server may have processed them. Other requests are only
+    sent again when the connection could not be established.
+
+    :param max_attempts: maximum number of times a request is sent
+    :type max_attempts: :class:`int`
+    :param exceptions: exceptions on which a request is sent again
+    :type exceptions: :class:`tuple`
+    :param status_codes: status codes on which a request is sent again
+    :type status_codes: :class:`tuple`
+    :param methods: idempotent HTTP methods
+    :type methods: :class:`tuple`
+    :param backoff: delay in seconds before the first retry
+    :type backoff: :class:`float`
+    :param max_backoff: maximum delay in seconds between two attempts
+    :type max_backoff: :class:`float`
+    :param jitter: if True, delays are randomly taken between the half and
+                   the whole of the exponential delay
+    :type jitter: :class:`bool`
+    :param budget: no retry is done if it would be sent this number of
+                   seconds after the first attempt
+    :type budget: :class:`float`
+    """
+
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE', 'PUT', 'DELETE')
+
+    def __init__(self, max_attempts=3, exceptions=(ConnectionError, Timeout), status_codes=(429, 502, 503, 504),
+                 methods=IDEMPOTENT_METHODS, backoff=0.5, max_backoff=30, jitter=True, budget=60):
+        self.max_attempts = max_attempts
+        self.exceptions = exceptions
+        self.status_codes = status_codes
+        self.methods = methods
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.budget = budget
+
+    def __repr__(self):
+        return '<RetryPolicy max_attempts=%r status_codes=%r budget=%r>' % (self.max_attempts, self.status_codes,
+                                                                            self.budget)
+
+    def is_retryable(self, request, response=None, exception=None):
+        """
+        Whether a request can be sent again after this response or exception.
+        """
+        if hasattr(request.body, 'read'):
+            # A file can't be read twice.
+            return False
+
+        if exception is not None:
+            if not isinstance(exception, self.exceptions):
+                return False
+            return request.method in self.methods or isinstance(exception, ConnectTimeout)
+
+        return response.status_code in self.status_codes and request.method in self.methods
+
+    def get_delay(self, attempt, response=None):
+        """
+        Get the delay before sending a request again.
+
+        :param attempt: number of the failed attempt, from 1
+        :type attempt: :class:`int`
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(delay / 2., delay)
+        if response is not None:
+            retry_after = HostLimiter.parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        return delay
+
+
+class RetryMetrics(object):
+    """
+    Counters of requests sent with a :class:`RetryPolicy`: requests, times
+    they were sent, retries, requests which failed after the last allowed
+    attempt, and seconds spent waiting between attempts.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.given_up = 0
+        self.wait_time = 0.
+
+    def record(self, requests=0, attempts=0, retries=0, given_up=0, wait_time=0.):
+        with self.lock:
+            self.requests += requests
+            self.attempts += attempts
+            self.retries += retries
+            self.given_up += given_up
+            self.wait_time += wait_time
+
+    def to_dict(self):
+        """
+        :rtype: :class:`dict`
+        """
+        with self.lock:
+            return {'requests': self.requests, 'attempts': self.attempts, 'retries': self.retries,
+                    'given_up': self.given_up, 'wait_time': self.wait_time}
+
+
+class _Scheduler(object):
+    """
+    Thread which calls functions after a delay, so that waiting for a retry
+    does not hold a worker of the session.
+    """
+
+    def __init__(self):
+        self.logger = getLogger('browser.retry')
+        self.jobs = []
+        self.counter = count()
+        self.condition = Condition(Lock())
+        self.thread = None
+
+    def schedule(self, delay, func):
+        with self.condition:
+            heapq.heappush(self.jobs, (time.time() + delay, next(self.counter), func))
+            if self.thread is None:
+                self.thread = Thread(target=self.run, name='RetryScheduler')
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.jobs or self.jobs[0][0] > time.time():
+                    self.condition.wait(self.jobs[0][0] - time.time() if self.jobs else None)
+                _, _, func = heapq.heappop(self.jobs)
+            try:
+                func()
+            except Exception:
+                self.logger.exception('Unable to retry a request')
+
+
+_scheduler = _Scheduler()
+
+
+class _Retry(Exception):
+    """
+    Raised in the callback of an attempt whose response has to be retried.
+    """
+
+    def __init__(self, response, delay):
+        super(_Retry, self).__init__('%s %s' % (response.status_code, response.url))
+        self.response = response
+        self.delay = delay
+
+
+class RetryRequest(object):
+    """
+    A request sent with a :class:`RetryPolicy`.
+
+    :param policy: retry policy
+    :type policy: :class:`RetryPolicy`
+    :param metrics: counters to update
+    :type metrics: :class:`RetryMetrics`
+    :param request: prepared request
+    :type request: :class:`requests.PreparedRequest`
+    :param send: function which sends the request with a callback, and
+                 returns the result of the callback, or a future if `async`
+                 is True
+    :type send: :class:`callable`
+    """
+
+    def __init__(self, policy, metrics, request, send, logger=None):
+        self.policy = policy
+        self.metrics = metrics
+        self.request = request
+        self.send = send
+        self.logger = logger or getLogger('browser.retry')
+        self.start = None
+
+    def next_delay(self, attempt, response=None, exception=None):
+        """
+        Get the delay before the next attempt, or None if the request
+        should not be sent again.
+        """
+        if not self.policy.is_retryable(self.request, response, exception):
+            return None
+
+        delay = self.policy.get_delay(attempt, response)
+        if attempt >= self.policy.max_attempts or time.time() + delay - self.start > self.policy.budget:
+            self.logger.debug('Giving up %s %s after %d attempts', self.request.method, self.request.url, attempt)
+            self.metrics.record(given_up=1)
+            return None
+
+        self.logger.debug('Attempt %d of %s %s failed (%s), retrying in %.1fs', attempt, self.request.method,
+                          self.request.url, exception or response.status_code, delay)
+        self.metrics.record(retries=1, wait_time=delay)
+        return delay
+
+    def get_callback(self, attempt, callback):
+        def attempt_callback(future, response):
+            delay = self.next_delay(attempt, response=response)
+            if delay is not None:
+                response.close()
+                raise _Retry(response, delay)
+            return callback(future, response)
+        return attempt_callback
+
+    def run(self, callback, async=False):
+        """
+        Send the request.
+
+        :param callback: callback of the final response
+        :param async: if True, return a future
+        """
+        self.start = time.time()
+        self.metrics.record(requests=1)
+        if async:
+            return self.run_async(callback)
+
+        attempt = 1
+        while True:
+            self.metrics.record(attempts=1)
+            try:
+                return self.send(self.get_callback(attempt, callback), False)
+            except _Retry as e:
+                delay = e.delay
+            except Exception as e:
+                delay = self.next_delay(attempt, exception=e)
+                if delay is None:
+                    raise
+
+            time.sleep(delay)
+            attempt += 1
+
+    def run_async(self, callback):
+        if Future is None:
+            raise ImportError('Please install python-concurrent.futures')
+
+        result = Future()
+        result.set_running_or_notify_cancel()
+
+        def attempt(number):
+            self.metrics.record(attempts=1)
+            try:
+                future = self.send(self.get_callback(number, callback), True)
+            except Exception as e:
+                result.set_exception(e)
+            else:
+                future.add_done_callback(lambda future: done(number, future))
+
+        def done(number, future):
+            exception = future.exception()
+            if exception is None:
+                result.set_result(future.result())
+                return
+
+            if isinstance(exception, _Retry):
+                delay = exception.delay
+            else:
+                delay = self.next_delay(number, exception=exception)
+            if delay is None:
+                result.set_exception(exception)
+                return
+            _scheduler.schedule(delay, lambda: attempt(number + 1))
+
+        attempt(1)
+        return result
@@ -28,12 +28,14 @@ except ImportError:
 from requests import Session
 from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
 from requests.compat import cookielib, OrderedDict
-from requests.cookies import cookiejar_from_dict, RequestsCookieJar
+from requests.cookies import cookiejar_from_dict
 from requests.models import PreparedRequest
 from requests.sessions import merge_setting
 from requests.structures import CaseInsensitiveDict
 from requests.utils import get_netrc_auth
 
+from .cookies import LayeredCookieJar
+
 
 def merge_hooks(request_hooks, session_hooks, dict_class=OrderedDict):
     """
@@ -74,12 +76,10 @@ class WeboobSession(Session):
         if not isinstance(cookies, cookielib.CookieJar):
             cookies = cookiejar_from_dict(cookies)
 
-        # Merge with session cookies
-        merged_cookies = RequestsCookieJar()
-        merged_cookies.update(self.cookies)
+        # Merge with session cookies, without copying them.
+        merged_cookies = LayeredCookieJar(self.cookies)
         merged_cookies.update(cookies)
 
-
         # Set environment's basic authentication if not explicitly set.
         auth = request.auth
         if self.trust_env and not auth and not self.auth:
@@ -125,6 +125,8 @@ class FuturesSession(WeboobSession):
                 self.mount('http://', HTTPAdapter(**adapter_kwargs))
 
         self.executor = executor
+        # weboob.browser.ratelimit.RateLimiter of requests, if any
+        self.limiter = None
 
     def send(self, *args, **kwargs):
         """Maintains the existing api for :meth:`Session.send`
@@ -141,8 +143,15 @@ class FuturesSession(WeboobSession):
 
         callback = kwargs.pop('callback', lambda future, response: response)
         async = kwargs.pop('async', False)
-        def func(*args, **kwargs):
-            resp = sup(*args, **kwargs)
+        def func(request, *args, **kwargs):
+            if self.limiter is None:
+                resp = sup(request, *args, **kwargs)
+            else:
+                # Redirections are also sent with this method, so the
+                # limiter only gets the first response.
+                with self.limiter.limit(request) as limiter:
+                    resp = sup(request, *args, **kwargs)
+                    limiter.feedback(resp.history[0] if resp.history else resp)
             return callback(self, resp)
 
         if async:
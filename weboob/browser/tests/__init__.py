@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+from threading import Thread
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+
+from requests.models import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+
+
+__all__ = ['LocalHandler', 'LocalServer', 'make_request', 'make_response']
+
+
+def make_request(url='http://weboob.org/', **headers):
+    request = PreparedRequest()
+    request.prepare(method='GET', url=url, headers=headers)
+    return request
+
+
+def make_response(status_code=200, url='http://weboob.org/', **headers):
+    response = Response()
+    response.status_code = status_code
+    response.url = url
+    response.headers = CaseInsensitiveDict(headers)
+    return response
+
+
+# Base of handlers of LocalServer, which do not log requests
+class LocalHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+
+    def send_body(self, body, status=200, headers=()):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+# HTTP server listening on a free local port, which handles each request in a thread
+class LocalServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), handler)
+        self.port = self.server_port
+        self.baseurl = 'http://127.0.0.1:%d' % self.port
+
+    def start(self):
+        thread = Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+from unittest import TestCase
+
+from weboob.browser import DomainBrowser
+from weboob.browser.adapters import pool_registry
+
+from . import LocalHandler, LocalServer
+
+
+# Serves cookies it receives, and counts connections
+class EchoHandler(LocalHandler):
+    connections = 0
+    logins = 0
+
+    def setup(self):
+        EchoHandler.connections += 1
+        LocalHandler.setup(self)
+
+    def do_GET(self):
+        headers = []
+        if self.path == '/login':
+            EchoHandler.logins += 1
+            headers.append(('Set-Cookie', 'session=%d; Path=/' % self.logins))
+        self.send_body(self.headers.get('Cookie', ''), headers=headers)
+
+
+class SharedBrowser(DomainBrowser):
+    SHARE_CONNECTIONS = True
+
+
+# Class that tests sharing of connections between browsers
+class SharedPoolsTest(TestCase):
+
+    def setUp(self):
+        EchoHandler.connections = 0
+        self.server = LocalServer(EchoHandler).start()
+        self.baseurl = self.server.baseurl
+
+    def tearDown(self):
+        pool_registry.clear()
+        self.server.close()
+
+    def test_shared(self):
+        browsers = [SharedBrowser(baseurl=self.baseurl) for _ in xrange(3)]
+        for browser in browsers:
+            browser.open('/login')
+        self.assertEquals(EchoHandler.connections, 1)
+
+        # Each browser keeps its own cookies.
+        cookies = [browser.open('/').text for browser in browsers]
+        self.assertEquals(len(set(cookies)), 3)
+        self.assertEquals(EchoHandler.connections, 1)
+
+    def test_not_shared(self):
+        for _ in xrange(3):
+            DomainBrowser(baseurl=self.baseurl).open('/')
+        self.assertEquals(EchoHandler.connections, 3)
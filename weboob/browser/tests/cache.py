@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from requests.structures import CaseInsensitiveDict
+
+from weboob.browser import DomainBrowser
+from weboob.browser.cache import CacheAdapter, CachePolicy, HTTPCache
+
+from . import LocalHandler, LocalServer, make_request, make_response
+
+
+# Class that tests freshness and storage rules of CacheAdapter
+class CacheAdapterTest(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.adapter = CacheAdapter(HTTPCache(self.path, 1024))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_freshness_max_age(self):
+        headers = CaseInsensitiveDict({'Cache-Control': 'public, max-age=3600'})
+        self.assertEquals(self.adapter.freshness(headers, CachePolicy()), 3600)
+
+    def test_freshness_no_cache(self):
+        headers = CaseInsensitiveDict({'Cache-Control': 'no-cache, max-age=3600'})
+        self.assertEquals(self.adapter.freshness(headers, CachePolicy()), 0)
+
+    def test_freshness_expires(self):
+        headers = CaseInsensitiveDict({'Date': 'Mon, 05 Jan 2015 10:00:00 GMT',
+                                       'Expires': 'Mon, 05 Jan 2015 11:00:00 GMT'})
+        self.assertEquals(self.adapter.freshness(headers, CachePolicy()), 3600)
+
+    def test_freshness_policy(self):
+        headers = CaseInsensitiveDict({'Cache-Control': 'no-cache'})
+        self.assertEquals(self.adapter.freshness(headers, CachePolicy(max_age=10)), 10)
+
+    def test_storable(self):
+        self.assertTrue(self.adapter.is_storable(make_request(), make_response(ETag='"x"'), CachePolicy()))
+        self.assertFalse(self.adapter.is_storable(make_request(), make_response(), CachePolicy()))
+        self.assertFalse(self.adapter.is_storable(make_request(), make_response(ETag='"x"'), CachePolicy(store=False)))
+        self.assertFalse(self.adapter.is_storable(make_request(), make_response(404, ETag='"x"'), CachePolicy()))
+
+    # Private data must never be shared through the cache
+    def test_not_storable_private(self):
+        self.assertFalse(self.adapter.is_storable(make_request(Authorization='Basic eA=='),
+                                                  make_response(ETag='"x"'), CachePolicy()))
+        self.assertFalse(self.adapter.is_storable(make_request(),
+                                                  make_response(**{'ETag': '"x"', 'Set-Cookie': 'a=b'}), CachePolicy()))
+        self.assertFalse(self.adapter.is_storable(make_request(),
+                                                  make_response(**{'ETag': '"x"', 'Cache-Control': 'private'}), CachePolicy()))
+        self.assertFalse(self.adapter.is_storable(make_request(Cookie='session=a'),
+                                                  make_response(ETag='"x"'), CachePolicy()))
+        self.assertFalse(self.adapter.is_storable(make_request(),
+                                                  make_response(**{'ETag': '"x"', 'Vary': '*'}), CachePolicy()))
+
+    def test_lru_eviction(self):
+        cache = self.adapter.cache
+        cache.store('a', {'content': 'a' * 400})
+        cache.store('b', {'content': 'b' * 400})
+        cache.load('a')
+        cache.store('c', {'content': 'c' * 400})
+        self.assertEquals(sorted(os.listdir(self.path)), ['a', 'c'])
+
+
+# Answers the cookies of requests, or their Accept-Language on /vary, with a counter
+class EchoHandler(LocalHandler):
+    count = 0
+
+    def do_GET(self):
+        EchoHandler.count += 1
+        headers = [('Cache-Control', 'max-age=3600')]
+        if self.path == '/vary':
+            header = 'Accept-Language'
+            headers.append(('Vary', 'Accept-Language'))
+        else:
+            header = 'Cookie'
+        self.send_body('%s %s %d' % (self.path, self.headers.get(header, ''), self.count), headers=headers)
+
+
+# Class that tests browsers sharing a cache directory
+class SharedCacheTest(TestCase):
+
+    def setUp(self):
+        EchoHandler.count = 0
+        self.path = tempfile.mkdtemp()
+        self.server = LocalServer(EchoHandler).start()
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.path)
+
+    def get_browser(self, session=None):
+        class Browser(DomainBrowser):
+            HTTP_CACHE = self.path
+        browser = Browser(baseurl=self.server.baseurl)
+        if session is not None:
+            browser.session.cookies.set('session', session)
+        return browser
+
+    def test_public(self):
+        self.assertEquals(self.get_browser().open('/').text, '/  1')
+        self.assertEquals(self.get_browser().open('/').text, '/  1')
+
+    def test_cookies(self):
+        # Pages of an account are not served to another one.
+        self.assertEquals(self.get_browser('a').open('/').text, '/ session=a 1')
+        self.assertEquals(self.get_browser('b').open('/').text, '/ session=b 2')
+        self.assertEquals(self.get_browser('a').open('/').text, '/ session=a 3')
+        self.assertEquals(os.listdir(self.path), [])
+
+    def test_vary(self):
+        browser = self.get_browser()
+        self.assertEquals(browser.open('/vary', headers={'Accept-Language': 'fr'}).text, '/vary fr 1')
+        self.assertEquals(browser.open('/vary', headers={'Accept-Language': 'en'}).text, '/vary en 2')
+        self.assertEquals(browser.open('/vary', headers={'Accept-Language': 'en'}).text, '/vary en 2')
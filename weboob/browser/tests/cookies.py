@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+from unittest import TestCase
+
+from requests.cookies import create_cookie, merge_cookies
+from requests.models import Request
+
+from weboob.browser.cookies import WeboobCookieJar, LayeredCookieJar
+from weboob.browser.sessions import WeboobSession
+
+
+# Class that tests cookies of requests seen on top of cookies of the session
+class LayeredCookieJarTest(TestCase):
+
+    def setUp(self):
+        self.session = WeboobSession()
+        self.session.cookies = WeboobCookieJar()
+        self.session.cookies.set_cookie(create_cookie('a', '1', domain='weboob.org', path='/'))
+        self.session.cookies.set_cookie(create_cookie('b', '2', domain='weboob.org', path='/private'))
+        self.session.cookies.set_cookie(create_cookie('c', '3', domain='example.org', path='/'))
+
+    def prepare(self, url, cookies=None):
+        return self.session.prepare_request(Request('GET', url, cookies=cookies))
+
+    def test_header(self):
+        self.assertEquals(self.prepare('http://weboob.org/').headers['Cookie'], 'a=1')
+        self.assertEquals(self.prepare('http://weboob.org/private/x').headers['Cookie'], 'b=2; a=1')
+        self.assertEquals(self.prepare('http://example.org/').headers['Cookie'], 'c=3')
+
+    def test_request_cookies(self):
+        preq = self.prepare('http://weboob.org/', {'a': '4', 'd': '5'})
+        self.assertEquals(preq.headers['Cookie'], 'a=4; d=5; a=1')
+        self.assertEquals(sorted(c.name for c in preq._cookies), ['a', 'a', 'b', 'c', 'd'])
+
+        # A cookie of the request hides the one of the session.
+        cookies = WeboobCookieJar()
+        cookies.set_cookie(create_cookie('a', '4', domain='weboob.org', path='/'))
+        preq = self.prepare('http://weboob.org/', cookies)
+        self.assertEquals(preq.headers['Cookie'], 'a=4')
+        self.assertEquals(self.session.cookies.get('a'), '1')
+
+    def test_isolation(self):
+        preq = self.prepare('http://weboob.org/')
+        preq._cookies.set_cookie(create_cookie('e', '6', domain='weboob.org', path='/'))
+        self.assertTrue(isinstance(preq._cookies, LayeredCookieJar))
+        self.assertEquals(self.session.cookies.get('e'), None)
+        # Cookies set on the session later are seen by the request.
+        self.session.cookies.set_cookie(create_cookie('f', '7', domain='weboob.org', path='/'))
+        self.assertEquals(preq._cookies.get('f'), '7')
+
+    def test_merge_session(self):
+        # As done by requests on redirections.
+        cookies = WeboobCookieJar()
+        cookies.set_cookie(create_cookie('a', '4', domain='weboob.org', path='/'))
+        preq = self.prepare('http://weboob.org/', cookies)
+        merge_cookies(preq._cookies, self.session.cookies)
+        self.assertEquals(preq._cookies.get('a'), '1')
+        self.assertEquals(len(preq._cookies), 3)
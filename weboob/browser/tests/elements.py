@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import time
+from threading import Thread
+from unittest import TestCase
+
+from lxml import html
+from requests.models import Response
+
+from weboob.browser.browsers import Browser
+from weboob.browser.elements import DataError, ListElement, TableElement, ItemElement
+from weboob.browser.filters.standard import CleanText, CleanDecimal, Date, Env, Format, TableCell, ColumnNotFound, \
+                                            _Filter, _context
+from weboob.browser.pages import HTMLPage, NextPage
+from weboob.capabilities.base import BaseObject, Field, StringField
+from weboob.capabilities.bank import Transaction
+from weboob.tools.log import getLogger, DEBUG_FILTERS
+
+
+HTML = u'''<html><body><table>
+<thead><tr><th>Date</th><th colspan="2">Name</th><th>Amount</th></tr></thead>
+<tbody>
+<tr><td>01/02/2015</td><td>Transaction 1</td><td>a</td><td>-1,42</td></tr>
+<tr><td>03/02/2015</td><td> Transaction
+  2 </td><td>b</td><td>2 000,00</td></tr>
+<tr><td>04/02/2015</td><td>Transaction 3</td><td>c</td><td>0,10</td></tr>
+</tbody></table></body></html>'''
+
+
+class HistoryTable(TableElement):
+    head_xpath = '//table/thead/tr/th'
+    item_xpath = '//table/tbody/tr'
+
+    col_date = u'Date'
+    col_label = [u'Label', u'Name']
+    col_amount = u'Amount'
+
+    class item(ItemElement):
+        klass = Transaction
+
+        obj_id = Format('%s-%s', Env('account'), CleanText(TableCell('label')))
+        obj_date = Date(CleanText(TableCell('date')), dayfirst=True)
+        obj_label = CleanText(TableCell('label'))
+        obj_category = CleanText(TableCell('category', 'missing', default=u'none'))
+        obj_amount = CleanDecimal(TableCell('amount'), replace_dots=True)
+        obj_raw = CleanText('./td[3]')
+
+        def obj_type(self):
+            return len(self.obj.label)
+
+
+class MissingColumnTable(HistoryTable):
+    class item(ItemElement):
+        klass = Transaction
+
+        obj_label = CleanText(TableCell('category'))
+
+
+class TablePage(HTMLPage):
+    def iter_history(self, table, compiled):
+        table.item.compile_filters = compiled
+        try:
+            return [obj.to_dict() for obj in table(self)()]
+        finally:
+            table.item.compile_filters = False
+
+
+# Class that tests compiled filters give the same objects than default ones
+class CompiledFiltersTest(TestCase):
+
+    def setUp(self):
+        response = Response()
+        response.status_code = 200
+        response.url = 'http://weboob.org/history'
+        response._content = HTML.encode('utf-8')
+        response.encoding = 'utf-8'
+        self.page = TablePage(Browser(), response, {'account': u'12345'})
+
+    def test_table(self):
+        expected = self.page.iter_history(HistoryTable, False)
+        self.assertEquals(len(expected), 3)
+        self.assertEquals(expected[1]['label'], u'Transaction 2')
+        self.assertEquals(expected[1]['category'], u'none')
+        self.assertEquals(self.page.iter_history(HistoryTable, True), expected)
+        # The compiled plan is reused.
+        self.assertEquals(self.page.iter_history(HistoryTable, True), expected)
+
+    def test_missing_column(self):
+        self.assertRaises(ColumnNotFound, self.page.iter_history, MissingColumnTable, False)
+        self.assertRaises(ColumnNotFound, self.page.iter_history, MissingColumnTable, True)
+
+
+LIST = u'''<html><body><ul>
+<li id="1">a</li><li id="2">b</li><li id="3">c</li>
+</ul><a>list-2.html</a></body></html>'''
+
+DUPLICATES = u'''<html><body><ul>
+<li id="1">a</li><li id="2">b</li><li id="1">c</li>
+</ul><a>list-2.html</a></body></html>'''
+
+
+# Object which is not a page of a browser, to build elements on a document
+class DocPage(object):
+    def __init__(self, text, params=None):
+        self.doc = html.fromstring(text)
+        self.params = params or {}
+
+
+class ValuesList(ListElement):
+    item_xpath = '//li'
+    next_page = CleanText('//a')
+
+    class item(ItemElement):
+        klass = BaseObject
+
+        obj_id = CleanText('./@id')
+
+
+class StreamingValuesList(ValuesList):
+    streaming = True
+
+
+class IgnoreDuplicatesList(StreamingValuesList):
+    ignore_duplicate = True
+
+
+class Value(BaseObject):
+    tags = Field('Tags', list)
+    label = StringField('Label')
+    details = StringField('Details')
+
+
+class TagsList(ListElement):
+    item_xpath = '//li'
+
+    class item(ItemElement):
+        klass = Value
+
+        def parse(self, el):
+            # Only seen by this item.
+            self.env['tags'].append(el.get('id'))
+            self.env['label'] = el.text
+            del self.env['details']
+
+        obj_id = CleanText('./@id')
+        obj_tags = Env('tags')
+        obj_label = Env('label')
+        obj_details = Env('details', default=None)
+
+
+class BaseDetailsList(ListElement):
+    item_xpath = '//li'
+
+    class item(ItemElement):
+        klass = Value
+
+        load_details = Format('details of %s', CleanText('.'))
+
+        obj_id = CleanText('./@id')
+
+        def obj_details(self):
+            return self.loaders['details']
+
+
+class DetailsList(BaseDetailsList):
+    class other(BaseDetailsList.item):
+        load_label = CleanText('.')
+
+        def obj_id(self):
+            return u'other-%s' % self.el.get('id')
+
+        def obj_label(self):
+            return self.loaders['label']
+
+
+# Class that tests iteration on ListElement
+class ListElementTest(TestCase):
+
+    def iter_ids(self, element):
+        """
+        Get IDs of objects of a list, and its next page.
+        """
+        ids = []
+        try:
+            for obj in element():
+                ids.append(obj.id)
+        except NextPage as e:
+            return ids, e.request
+        return ids, None
+
+    def test_without_browser(self):
+        self.assertEquals(self.iter_ids(ValuesList(DocPage(LIST))), ([u'1', u'2', u'3'], u'list-2.html'))
+
+    def test_streaming_duplicates(self):
+        values = StreamingValuesList(DocPage(DUPLICATES))()
+        self.assertEquals([next(values).id, next(values).id], [u'1', u'2'])
+        self.assertRaises(DataError, next, values)
+
+        element = IgnoreDuplicatesList(DocPage(DUPLICATES))
+        self.assertEquals(self.iter_ids(element), ([u'1', u'2'], u'list-2.html'))
+        # Only IDs of yielded objects are kept.
+        self.assertEquals(element.objects, {})
+        self.assertEquals(element.ids, set([u'1', u'2']))
+
+    def test_env(self):
+        params = {'tags': [u'page'], 'details': u'page details'}
+        objects = list(TagsList(DocPage(LIST, params))())
+        self.assertEquals([obj.tags for obj in objects], [[u'page', u'1'], [u'page', u'2'], [u'page', u'3']])
+        self.assertEquals([obj.label for obj in objects], [u'a', u'b', u'c'])
+        self.assertEquals([obj.details for obj in objects], [None, None, None])
+        # Items do not change parameters of the page.
+        self.assertEquals(params, {'tags': [u'page'], 'details': u'page details'})
+
+    def test_nested_classes(self):
+        self.assertEquals(BaseDetailsList._item_classes, [BaseDetailsList.item])
+        self.assertEquals(DetailsList._item_classes, [DetailsList.item, DetailsList.other])
+        self.assertEquals(DetailsList.other._loaders_names, [('details', 'load_details'), ('label', 'load_label')])
+
+        objects = list(DetailsList(DocPage(LIST))())
+        self.assertEquals([obj.id for obj in objects], [u'1', u'other-1', u'2', u'other-2', u'3', u'other-3'])
+        self.assertEquals(objects[1].details, u'details of a')
+        self.assertEquals(objects[1].label, u'a')
+
+
+# Filter which returns the attribute being filled, before and after other
+# threads run
+class ContextKey(_Filter):
+    def __call__(self, item):
+        key = _context.key
+        time.sleep(0.001)
+        return key, _context.key
+
+
+# Class that tests the context of filters is not shared between threads
+class FilterContextTest(TestCase):
+
+    def setUp(self):
+        self.logger = getLogger('b2filters')
+        self.level = self.logger.level
+        # The context is only kept to debug filters.
+        self.logger.setLevel(DEBUG_FILTERS)
+
+    def tearDown(self):
+        self.logger.setLevel(self.level)
+
+    def test_threads(self):
+        results = {}
+
+        def evaluate(key):
+            results[key] = [ContextKey().evaluate(None, key) for _ in xrange(50)]
+
+        threads = [Thread(target=evaluate, args=(key,)) for key in ('a', 'b')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEquals(results, {'a': [('a', 'a')] * 50, 'b': [('b', 'b')] * 50})
+        self.assertEquals(_context.stack, [])
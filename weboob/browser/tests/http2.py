@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import time
+from threading import Thread
+from unittest import TestCase
+
+from requests.exceptions import ReadTimeout, SSLError
+
+from weboob.browser import DomainBrowser
+from weboob.tools.test import SkipTest
+
+from . import LocalHandler, LocalServer
+
+
+# Minimal HTTP/2 server, which answers the path and cookies of requests
+class H2Server(object):
+
+    def __init__(self, certfile, keyfile):
+        import h2.connection
+        self.h2 = h2
+        self.connections = 0
+
+        self.context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        self.context.load_cert_chain(certfile, keyfile)
+        self.context.set_alpn_protocols(['h2'])
+
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(5)
+        self.port = self.sock.getsockname()[1]
+
+        thread = Thread(target=self.serve)
+        thread.daemon = True
+        thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                sock, _ = self.sock.accept()
+            except socket.error:
+                return
+            self.connections += 1
+            thread = Thread(target=self.handle, args=(sock,))
+            thread.daemon = True
+            thread.start()
+
+    def handle(self, sock):
+        try:
+            sock = self.context.wrap_socket(sock, server_side=True)
+        except (socket.error, ssl.SSLError):
+            return
+        conn = self.h2.connection.H2Connection(client_side=False)
+        conn.initiate_connection()
+        sock.sendall(conn.data_to_send())
+        while True:
+            try:
+                data = sock.recv(65535)
+            except (socket.error, ssl.SSLError):
+                return
+            if not data:
+                return
+
+            for event in conn.receive_data(data):
+                if not isinstance(event, self.h2.events.RequestReceived):
+                    continue
+                headers = dict(event.headers)
+                body = ('%s %s' % (headers[':path'], headers.get('cookie', ''))).encode('utf-8')
+                response = [(':status', '200'), ('content-length', str(len(body)))]
+                if headers[':path'] == '/login':
+                    response.append(('set-cookie', 'session=%d; Path=/' % event.stream_id))
+                conn.send_headers(event.stream_id, response)
+                conn.send_data(event.stream_id, body, end_stream=True)
+            sock.sendall(conn.data_to_send())
+
+    def close(self):
+        self.sock.close()
+
+
+# Answers the path and cookies of requests with HTTP/1.1 only
+class H1Handler(LocalHandler):
+    # Writes go straight to the TLS socket, which is closed after /close.
+    wbufsize = 0
+
+    def do_GET(self):
+        if self.path == '/slow':
+            time.sleep(1)
+        self.send_body('%s %s' % (self.path, self.headers.get('Cookie', '')))
+        if self.path == '/close':
+            # Close the connection without telling the client.
+            self.close_connection = 1
+
+
+class H1Server(LocalServer):
+
+    def handle_error(self, request, client_address):
+        # Connections closed by clients
+        pass
+
+    def __init__(self, certfile, keyfile):
+        LocalServer.__init__(self, H1Handler)
+        self.socket = ssl.wrap_socket(self.socket, keyfile, certfile, server_side=True)
+        self.start()
+
+
+# Class that tests the HTTP/2 transport against a local server
+class HTTP2Test(TestCase):
+
+    def setUp(self):
+        try:
+            __import__('h2')
+            __import__('hyper')
+        except ImportError:
+            raise SkipTest('python-hyper is not installed')
+
+        self.path = tempfile.mkdtemp()
+        self.certfile = os.path.join(self.path, 'cert.pem')
+        self.keyfile = os.path.join(self.path, 'key.pem')
+        try:
+            subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                                   '-subj', '/CN=localhost', '-keyout', self.keyfile, '-out', self.certfile],
+                                  stdout=open(os.devnull, 'w'), stderr=subprocess.STDOUT)
+        except (OSError, subprocess.CalledProcessError):
+            shutil.rmtree(self.path)
+            raise SkipTest('unable to create a certificate with openssl')
+
+        self.server = H2Server(self.certfile, self.keyfile)
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.path)
+
+    def get_browser(self, verify, server=None):
+        class Browser(DomainBrowser):
+            HTTP2 = True
+            VERIFY = verify
+            MAX_WORKERS = 20
+        return Browser(baseurl='https://localhost:%d' % (server or self.server).port)
+
+    def test_multiplexing(self):
+        browser = self.get_browser(False)
+        self.assertEquals(browser.open('/login').text, '/login ')
+        self.assertEquals(browser.open('/?a=1').text, '/?a=1 session=1')
+
+        results = [browser.async_open('/page%d' % i, callback=lambda response: response.text)
+                   for i in xrange(10)]
+        self.assertEquals([future.result() for future in results],
+                          ['/page%d session=1' % i for i in xrange(10)])
+        self.assertEquals(self.server.connections, 1)
+        browser.session.close()
+
+    def test_verify(self):
+        browser = self.get_browser(True)
+        self.assertRaises(SSLError, browser.open, '/')
+        browser.session.close()
+
+    def test_http1_fallback(self):
+        server = H1Server(self.certfile, self.keyfile)
+        browser = self.get_browser(False, server)
+        try:
+            self.assertEquals(browser.open('/a').text, '/a ')
+            # Requests are sent one at a time on the connection.
+            results = [browser.async_open('/page%d' % i, callback=lambda response: response.text)
+                       for i in xrange(20)]
+            self.assertEquals([future.result() for future in results],
+                              ['/page%d ' % i for i in xrange(20)])
+        finally:
+            browser.session.close()
+            server.close()
+
+    def test_timeout(self):
+        server = H1Server(self.certfile, self.keyfile)
+        browser = self.get_browser(False, server)
+        try:
+            self.assertEquals(browser.open('/slow', timeout=3).text, '/slow ')
+            self.assertRaises(ReadTimeout, browser.open, '/slow', timeout=0.2)
+            # The connection which timed out is replaced.
+            self.assertEquals(browser.open('/a').text, '/a ')
+        finally:
+            browser.session.close()
+            server.close()
+
+    def test_closed_connection(self):
+        server = H1Server(self.certfile, self.keyfile)
+        browser = self.get_browser(False, server)
+        try:
+            self.assertEquals(browser.open('/close').text, '/close ')
+            self.assertEquals(browser.open('/a').text, '/a ')
+        finally:
+            browser.session.close()
+            server.close()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import re
+from unittest import TestCase
+
+from weboob.browser import PagesBrowser, URL
+from weboob.browser.elements import ListElement, ItemElement, method
+from weboob.browser.filters.html import Link
+from weboob.browser.filters.standard import CleanText, Regexp, RegexpError
+from weboob.browser.pages import HTMLPage
+from weboob.capabilities.base import BaseObject
+
+from . import LocalHandler, LocalServer
+
+
+PAGES = 5
+
+
+# Serves /list-N.html pages with two items and a link to the next page
+class ListHandler(LocalHandler):
+    requests = []
+    # values of the X-Test header of requests
+    tests = []
+
+    def do_GET(self):
+        m = re.match(r'^/list-(\d+)\.html$', self.path)
+        if m is None:
+            self.send_error(404)
+            return
+
+        self.requests.append(self.path)
+        self.tests.append(self.headers.get('X-Test'))
+        num = int(m.group(1))
+        body = '<html><body><ul><li>%d.1</li><li>%d.2</li></ul>' % (num, num)
+        if num < PAGES:
+            body += '<a href="list-%d.html">next</a>' % (num + 1)
+        body += '</body></html>'
+        self.send_body(body, headers=[('Content-Type', 'text/html')])
+
+
+class ValuesList(ListElement):
+    item_xpath = '//li'
+    next_page = Link('//a', default=None)
+
+    class item(ItemElement):
+        klass = BaseObject
+
+        obj_id = CleanText('.')
+
+
+class BrokenValuesList(ValuesList):
+    next_page = Regexp(Link('//a'), r'^nomatch$')
+
+
+class ListPage(HTMLPage):
+    iter_values = method(ValuesList)
+    iter_broken = method(BrokenValuesList)
+
+
+class ListBrowser(PagesBrowser):
+    list = URL(r'/list-(?P<num>\d+)\.html', ListPage)
+
+    def iter_values(self):
+        self.list.go(num=1)
+        return self.pagination(lambda: self.page.iter_values())
+
+    def iter_broken(self):
+        self.list.go(num=1)
+        return self.pagination(lambda: self.page.iter_broken())
+
+
+class LocationBrowser(ListBrowser):
+    def location(self, *args, **kwargs):
+        kwargs.setdefault('headers', {})['X-Test'] = '1'
+        return super(LocationBrowser, self).location(*args, **kwargs)
+
+
+# Class that tests prefetching of next pages by PagesBrowser.pagination
+class PaginationTest(TestCase):
+
+    def setUp(self):
+        ListHandler.requests = []
+        ListHandler.tests = []
+        self.server = LocalServer(ListHandler).start()
+        self.baseurl = self.server.baseurl
+
+    def tearDown(self):
+        self.server.close()
+
+    def get_ids(self, lookahead, limit=None, klass=ListBrowser):
+        browser = klass(baseurl=self.baseurl)
+        browser.PAGINATION_LOOKAHEAD = lookahead
+        ids = []
+        for obj in browser.iter_values():
+            ids.append(obj.id)
+            if len(ids) == limit:
+                break
+        browser.session.close()
+        return ids
+
+    def test_order(self):
+        expected = ['%d.%d' % (page, item) for page in xrange(1, PAGES + 1) for item in (1, 2)]
+        self.assertEquals(self.get_ids(0), expected)
+        for lookahead in (1, 3):
+            ListHandler.requests = []
+            self.assertEquals(self.get_ids(lookahead), expected)
+            # Each page is fetched once.
+            self.assertEquals(sorted(ListHandler.requests), sorted(set(ListHandler.requests)))
+            self.assertEquals(len(ListHandler.requests), PAGES)
+
+    def test_early_stop(self):
+        self.assertEquals(self.get_ids(2, limit=3), ['1.1', '1.2', '2.1'])
+        # Pages are not fetched beyond the lookahead.
+        self.assertLessEqual(len(ListHandler.requests), 4)
+
+    def test_next_page_error(self):
+        # Items are returned before the error of next_page, as without
+        # prefetching.
+        for lookahead in (0, 1):
+            browser = ListBrowser(baseurl=self.baseurl)
+            browser.PAGINATION_LOOKAHEAD = lookahead
+            iterator = browser.iter_broken()
+            self.assertEquals([next(iterator).id, next(iterator).id], ['1.1', '1.2'])
+            self.assertRaises(RegexpError, next, iterator)
+            browser.session.close()
+
+    def test_location_override(self):
+        # Next pages are requested through location().
+        self.assertEquals(len(self.get_ids(2, klass=LocationBrowser)), 2 * PAGES)
+        self.assertEquals(ListHandler.tests, ['1'] * PAGES)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import time
+from threading import Thread, Lock
+from unittest import TestCase
+
+from weboob.browser.ratelimit import HostLimiter, RateLimiter
+
+from . import make_request, make_response
+
+
+# Class that tests the token bucket and the concurrency limit of hosts
+class RateLimiterTest(TestCase):
+
+    def test_rate(self):
+        limiter = HostLimiter(rate=50, burst=2)
+        start = time.time()
+        for _ in xrange(7):
+            limiter.acquire()
+        # Two requests are sent at once, then one every 20ms.
+        self.assertGreaterEqual(time.time() - start, 0.09)
+
+    def test_concurrency(self):
+        limiter = RateLimiter(max_concurrency=2)
+        lock = Lock()
+        running = [0, 0]
+
+        def request():
+            with limiter.limit(make_request()):
+                with lock:
+                    running[0] += 1
+                    running[1] = max(running)
+                time.sleep(0.01)
+                # A redirection does not wait for a place.
+                with limiter.limit(make_request()):
+                    pass
+                with lock:
+                    running[0] -= 1
+
+        threads = [Thread(target=request) for _ in xrange(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEquals(running[1], 2)
+
+    def test_hosts(self):
+        limiter = RateLimiter(rate=1)
+        start = time.time()
+        for url in ('http://weboob.org/', 'http://example.org/', 'http://weboob.org:8080/'):
+            with limiter.limit(make_request(url)):
+                pass
+        self.assertLess(time.time() - start, 0.5)
+
+    def test_backoff(self):
+        limiter = HostLimiter(rate=100)
+        limiter.feedback(make_response(429, **{'Retry-After': '0'}))
+        self.assertEquals(limiter.rate, 50)
+        limiter.feedback(make_response(503))
+        self.assertEquals(limiter.delay, 1)
+        self.assertGreater(limiter.paused_until, time.time())
+        limiter.feedback(make_response(503))
+        self.assertEquals(limiter.delay, 2)
+        self.assertEquals(limiter.rate, 12.5)
+
+        limiter.paused_until = 0
+        for _ in xrange(20):
+            limiter.feedback(make_response())
+        self.assertEquals(limiter.delay, 0)
+        self.assertEquals(limiter.rate, 100)
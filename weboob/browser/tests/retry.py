@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import time
+from unittest import TestCase
+
+from weboob.browser import DomainBrowser
+from weboob.browser.exceptions import ServerError
+from weboob.browser.retry import RetryPolicy
+
+from . import LocalHandler, LocalServer
+
+
+# Answers 503 to the first requests of each path, /fail-N-times
+class FlakyHandler(LocalHandler):
+    counts = {}
+    order = []
+
+    def answer(self):
+        failures = int(self.path.split('-')[1]) if self.path.startswith('/fail-') else 0
+        count = self.counts[self.path] = self.counts.get(self.path, 0) + 1
+        if count <= failures:
+            self.send_body('busy', 503)
+        else:
+            self.order.append(self.path)
+            self.send_body('%s %d' % (self.path, count))
+
+    def do_GET(self):
+        self.answer()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.answer()
+
+
+class RetryBrowser(DomainBrowser):
+    MAX_WORKERS = 1
+    RETRY_POLICY = RetryPolicy(max_attempts=3, backoff=0.2, jitter=False, budget=5)
+
+
+# Class that tests sending requests again with a RetryPolicy
+class RetryTest(TestCase):
+
+    def setUp(self):
+        FlakyHandler.counts = {}
+        FlakyHandler.order = []
+        self.server = LocalServer(FlakyHandler).start()
+        self.browser = RetryBrowser(baseurl=self.server.baseurl)
+
+    def tearDown(self):
+        self.browser.session.close()
+        self.server.close()
+
+    def test_sync(self):
+        self.assertEquals(self.browser.open('/fail-2-times').text, '/fail-2-times 3')
+        self.assertRaises(ServerError, self.browser.open, '/fail-3-times')
+        metrics = self.browser.retry_metrics.to_dict()
+        self.assertEquals(metrics['requests'], 2)
+        self.assertEquals(metrics['attempts'], 6)
+        self.assertEquals(metrics['retries'], 4)
+        self.assertEquals(metrics['given_up'], 1)
+        self.assertAlmostEquals(metrics['wait_time'], 1.2)
+
+    def test_not_idempotent(self):
+        self.assertRaises(ServerError, self.browser.open, '/fail-1-times', data={'a': 'b'})
+        self.assertEquals(FlakyHandler.counts['/fail-1-times'], 1)
+
+    def test_budget(self):
+        self.browser.RETRY_POLICY = RetryPolicy(max_attempts=10, backoff=1, jitter=False, budget=2)
+        start = time.time()
+        self.assertRaises(ServerError, self.browser.open, '/fail-5-times')
+        self.assertLess(time.time() - start, 2)
+        self.assertEquals(FlakyHandler.counts['/fail-5-times'], 2)
+
+    def test_async(self):
+        # The only worker of the session is free while a request waits.
+        slow = self.browser.async_open('/fail-1-times', callback=lambda response: response.text)
+        fast = self.browser.async_open('/ok')
+        self.assertEquals(slow.result(), '/fail-1-times 2')
+        self.assertEquals(fast.result().status_code, 200)
+        self.assertEquals(FlakyHandler.order, ['/ok', '/fail-1-times'])
+
+        failed = self.browser.async_open('/fail-3-times')
+        self.assertRaises(ServerError, failed.result)
+        self.assertEquals(self.browser.retry_metrics.to_dict()['given_up'], 1)
@@ -17,8 +17,10 @@
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 from unittest import TestCase
 
+from requests.models import PreparedRequest, Response
+
 from weboob.browser import PagesBrowser, URL
-from weboob.browser.pages import Page
+from weboob.browser.pages import Page, RawPage
 from weboob.browser.url import UrlNotResolvable
 
 
@@ -127,3 +129,64 @@ class URLTest(TestCase):
         self.assertRaisesRegexp(AssertionError, "You can use this method" +
                                 " only if there is a Page class handler.",
                                 self.myBrowser.urlRegex.is_here, id=2)
+
+
+class MyMockRawPage(RawPage):
+    pass
+
+
+class MyMockNotHerePage(RawPage):
+    def is_here(self):
+        return False
+
+
+class MyMockDispatchBrowser(PagesBrowser):
+    BASEURL = "http://weboob.org/"
+
+    noPage = URL("news/(?P<id>\d+)")
+    notHere = URL("news/(?P<id>\d+)", MyMockNotHerePage)
+    news = URL("http://weboob.org/news/(?P<id>\d+)", "news/.*", MyMockRawPage)
+    other = URL("news/(?P<id>\d+)", MyMockRawPage)
+
+
+# Class that tests dispatch of responses to URL instances
+class URLDispatchTest(TestCase):
+
+    def setUp(self):
+        self.myBrowser = MyMockDispatchBrowser()
+
+    def make_response(self, url, method='GET'):
+        request = PreparedRequest()
+        request.prepare(method=method, url=url)
+        response = Response()
+        response.url = url
+        response.request = request
+        response._content = ''
+        return response
+
+    # Check that the first URL with a page class and whose page is here
+    # handles the response
+    def test_handle_first_match(self):
+        page = self.myBrowser._handle_response(self.make_response("http://weboob.org/news/42"))
+        self.assertIsInstance(page, MyMockRawPage)
+        self.assertEquals(page.url, "http://weboob.org/news/42")
+        self.assertEquals(page.params, {'id': '42'})
+
+    # Check that the first matching regexp of an URL is used
+    def test_handle_second_regex(self):
+        page = self.myBrowser._handle_response(self.make_response("http://weboob.org/news/foo"))
+        self.assertIsInstance(page, MyMockRawPage)
+        self.assertEquals(page.params, {})
+
+    def test_handle_no_match(self):
+        self.assertIsNone(self.myBrowser._handle_response(self.make_response("http://weboob.org/other")))
+        self.assertIsNone(self.myBrowser._handle_response(self.make_response("http://weboob.org/news/42", 'HEAD')))
+
+    # Check that indexes of URLs are not kept for every BASEURL ever used
+    def test_many_baseurls(self):
+        for i in xrange(100):
+            browser = MyMockDispatchBrowser(baseurl='http://%d.weboob.org/' % i)
+            page = browser._handle_response(self.make_response('http://%d.weboob.org/news/42' % i))
+            self.assertIsInstance(page, MyMockRawPage)
+        self.assertLessEqual(MyMockDispatchBrowser._urls_indexes.stats()['size'],
+                             MyMockDispatchBrowser._urls_indexes.max_size)
@@ -21,12 +21,93 @@ try:
     from urllib.parse import unquote
 except ImportError:
     from urllib import unquote
+from copy import copy
 import re
 import requests
 
+from weboob.tools.lrucache import LRUCache
 from weboob.tools.regex_helper import normalize
 
 
+_regexes = LRUCache(2048)
+_templates = LRUCache(1024)
+
+
+def compile_url_regex(regex, base):
+    """
+    Compile an URL regexp, relative ones being joined to the base URL.
+
+    Compiled regexps are cached, as the re module cache is too small
+    (and purged when full) for all URLs of loaded browsers. The cache is
+    bounded, as browsers may be built with many different base URLs.
+    """
+    if re.match(r'^\w+://.*', regex):
+        # absolute regexps do not depend on the base URL
+        base = None
+
+    def build():
+        if base is None:
+            return re.compile(regex)
+        return re.compile(re.escape(base).rstrip('/') + '/' + regex.lstrip('/'))
+
+    return _regexes.get((regex, base), build)
+
+
+def literal_prefix(regex):
+    """
+    Get the literal string every url matched by a regexp starts with.
+
+    >>> literal_prefix(r'http://weboob\.org/(?P<page>\w+)\.html')
+    'http://weboob.org/'
+    >>> literal_prefix(r'https?://weboob\.org/')
+    'http'
+    >>> literal_prefix(r'/a|/b')
+    ''
+    """
+    # Top-level alternatives and global flags make any prefix wrong.
+    depth = 0
+    escaped = in_class = False
+    for i, c in enumerate(regex):
+        if escaped:
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        elif in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+        elif c == '(':
+            if re.match(r'\(\?[iLmsux]+\)', regex[i:]):
+                return ''
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and depth == 0:
+            return ''
+
+    prefix = []
+    i = 0
+    while i < len(regex):
+        c = regex[i]
+        if c == '\\':
+            if i + 1 >= len(regex) or regex[i + 1].isalnum():
+                break
+            c = regex[i + 1]
+            i += 2
+        elif c in '.^$*+?{}[]|()':
+            break
+        else:
+            i += 1
+
+        if i < len(regex) and regex[i] in '*?{':
+            # this character is optional
+            break
+        prefix.append(c)
+        if i < len(regex) and regex[i] == '+':
+            break
+    return ''.join(prefix)
+
+
 class UrlNotResolvable(Exception):
     """
     Raised when trying to locate on an URL instance which url pattern is not resolvable as a real url.
@@ -39,13 +120,19 @@ class URL(object):
 
     It takes one or several regexps to match urls, and an optional Page
     class which is instancied by PagesBrowser.open if the page matches a regex.
+
+    The `cache` keyword argument sets the
+    :class:`weboob.browser.cache.CachePolicy` of matching urls, used when
+    :attr:`weboob.browser.browsers.Browser.HTTP_CACHE` is enabled.
     """
     _creation_counter = 0
 
-    def __init__(self, *args):
+    def __init__(self, *args, **kwargs):
         self.urls = []
         self.klass = None
         self.browser = None
+        self.cache = kwargs.pop('cache', None)
+        assert not kwargs, 'Unknown arguments: %s' % ', '.join(kwargs)
         for arg in args:
             if isinstance(arg, basestring):
                 self.urls.append(arg)
@@ -55,6 +142,15 @@ class URL(object):
         self._creation_counter = URL._creation_counter
         URL._creation_counter += 1
 
+    def bind(self, browser):
+        """
+        Get a copy of this URL bound to a browser. Regexps, page class and
+        other attributes are shared with this one.
+        """
+        url = copy(self)
+        url.browser = browser
+        return url
+
     def is_here(self, **kwargs):
         """
         Returns True if the current page of browser matches this URL.
@@ -125,32 +221,42 @@ class URL(object):
         """
         browser = kwargs.pop('browser', self.browser)
         params = kwargs.pop('params', None)
+        templates, patterns = self._get_templates()
+
+        try:
+            template = templates[frozenset(kwargs)]
+        except KeyError:
+            raise UrlNotResolvable('Unable to resolve URL with %r. Available are %s' % (kwargs, ', '.join(patterns)))
+
+        url = browser.absurl(template % kwargs, base=True)
+        if params:
+            p = requests.models.PreparedRequest()
+            p.prepare_url(url, params)
+            url = p.url
+        return url
+
+    def _get_templates(self):
+        """
+        Get templates to build urls, by set of parameters names, and the
+        list of reversed patterns.
+
+        They are computed once for each list of regexps.
+        """
+        return _templates.get(tuple(self.urls), self._build_templates)
+
+    def _build_templates(self):
+        templates = {}
         patterns = []
         for url in self.urls:
-            patterns += normalize(url)
-
-        for pattern, _ in patterns:
-            url = pattern
-            # only use full-name substitutions, to allow % in URLs
-            for kwkey in kwargs.keys():  # need to use keys() because of pop()
-                search = '%%(%s)s' % kwkey
-                if search in pattern:
-                    url = url.replace(search, unicode(kwargs.pop(kwkey)))
-            # if there are named substitutions left, ignore pattern
-            if re.search('%\([A-z_]+\)s', url):
-                continue
-            # if not all kwargs were used
-            if len(kwargs):
-                continue
-
-            url = browser.absurl(url, base=True)
-            if params:
-                p = requests.models.PreparedRequest()
-                p.prepare_url(url, params)
-                url = p.url
-            return url
-
-        raise UrlNotResolvable('Unable to resolve URL with %r. Available are %s' % (kwargs, ', '.join([pattern for pattern, _ in patterns])))
+            for pattern, names in normalize(url):
+                patterns.append(pattern)
+                # only use full-name substitutions, to allow % in URLs
+                parts = re.split(r'%\((\w+)\)s', pattern)
+                template = u''.join(part.replace(u'%', u'%%') if i % 2 == 0 else u'%%(%s)s' % part
+                                    for i, part in enumerate(parts))
+                # the first pattern using exactly these parameters is used
+                templates.setdefault(frozenset(names), template)
+        return templates, patterns
 
     def match(self, url, base=None):
         """
@@ -161,22 +267,23 @@ class URL(object):
             base = self.browser.BASEURL
 
         for regex in self.urls:
-            if not re.match(r'^\w+://.*', regex):
-                regex = re.escape(base).rstrip('/') + '/' + regex.lstrip('/')
-            m = re.match(regex, url)
+            m = compile_url_regex(regex, base).match(url)
             if m:
                 return m
 
-    def handle(self, response):
+    def handle(self, response, m=None):
         """
         Handle a HTTP response to get an instance of the klass if it matches.
+
+        :param m: match of the response url, if already known
         """
         if self.klass is None:
             return
         if response.request.method == 'HEAD':
             return
 
-        m = self.match(response.url)
+        if m is None:
+            m = self.match(response.url)
         if m:
             page = self.klass(self.browser, response, m.groupdict())
             if hasattr(page, 'is_here'):
@@ -22,6 +22,8 @@ import warnings
 import re
 from decimal import Decimal
 from copy import deepcopy, copy
+from itertools import izip
+from collections import deque
 
 from weboob.tools.compat import unicode, long
 from weboob.tools.misc import to_unicode
@@ -31,7 +33,7 @@ from weboob.tools.ordereddict import OrderedDict
 __all__ = ['UserError', 'FieldNotFound', 'NotAvailable',
            'NotLoaded', 'Capability', 'Field', 'IntField', 'DecimalField',
            'FloatField', 'StringField', 'BytesField',
-           'empty', 'BaseObject']
+           'empty', 'BaseObject', 'Column']
 
 
 def enum(**enums):
@@ -105,6 +107,8 @@ class ConversionWarning(UserWarning):
     """
     A field's type was changed when setting it.
     Ideally, the module should use the right type before setting it.
+
+    It is only emitted when :attr:`BaseObject.DEBUG_CONVERSIONS` is True.
     """
     pass
 
@@ -182,6 +186,32 @@ class Capability(object):
     """
 
 
+def _find_types(name):
+    """
+    Find every class named `name`.
+    """
+    # the following is a (almost) copy/paste from
+    # https://stackoverflow.com/questions/11775460/lexical-cast-from-string-to-type
+    types = ()
+    q = deque([object])
+    while q:
+        t = q.popleft()
+        if t.__name__ == name:
+            types += (t,)
+        else:
+            try:
+                # keep looking!
+                q.extend(t.__subclasses__())
+            except TypeError:
+                # type.__subclasses__ needs an argument for
+                # whatever reason.
+                if t is type:
+                    continue
+                else:
+                    raise
+    return types
+
+
 class Field(object):
     """
     Field of a :class:`BaseObject` class.
@@ -195,7 +225,7 @@ class Field(object):
 
     def __init__(self, doc, *args, **kwargs):
         self.types = ()
-        self.value = kwargs.get('default', NotLoaded)
+        self.value = self.normalize(kwargs.get('default', NotLoaded))
         self.doc = doc
 
         for arg in args:
@@ -204,15 +234,49 @@ class Field(object):
             else:
                 raise TypeError('Arguments must be types or strings of type name')
 
+        if any(isinstance(t, str) for t in self.types):
+            # Resolved by get_types().
+            self._actual_types = None
+        else:
+            self._actual_types = self.types
+        self._generation = None
+
         self._creation_counter = Field._creation_counter
         Field._creation_counter += 1
 
+    def get_types(self):
+        """
+        Get the tuple of types accepted by this field, with types given by
+        name resolved.
+
+        As they are usually forward references to objects, names are
+        resolved again only once new :class:`BaseObject` classes have been
+        created.
+        """
+        if self._actual_types is None or \
+           (self._generation is not None and self._generation != _BaseObjectMeta.generation):
+            actual_types = ()
+            for v in self.types:
+                if isinstance(v, str):
+                    actual_types += _find_types(v)
+                else:
+                    actual_types += (v,)
+            self._generation = _BaseObjectMeta.generation
+            self._actual_types = actual_types
+        return self._actual_types
+
     def convert(self, value):
         """
         Convert value to the wanted one.
         """
         return value
 
+    def normalize(self, value):
+        """
+        Normalize a value, already checked, before it is stored.
+        """
+        return value
+
 
 class IntField(Field):
     """
@@ -278,7 +342,52 @@ class BytesField(Field):
         return str(value)
 
 
+class _Deleted(object):
+    """
+    Value of a field removed from an object with del.
+    """
+
+
+# Default values which can be shared between objects without being copied.
+_IMMUTABLE_TYPES = (type(None), NotLoadedType, NotAvailableType, bool, int, long,
+                    float, Decimal, str, unicode, tuple, frozenset)
+
+
+class _FieldSlot(object):
+    """
+    Descriptor giving access to the value of a field, stored at `index` in
+    the flat list of values of an object.
+    """
+    __slots__ = ('name', 'index')
+
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        try:
+            value = obj._values[self.index]
+        except AttributeError:
+            # BaseObject.__init__ has not been called yet.
+            value = obj._init_values()[self.index]
+        if value is _Deleted:
+            raise AttributeError("'%s' object has no attribute '%s'" % (cls.__name__, self.name))
+        return value
+
+    def __set__(self, obj, value):
+        BaseObject.__setattr__(obj, self.name, value)
+
+    def __delete__(self, obj):
+        BaseObject.__delattr__(obj, self.name)
+
+
 class _BaseObjectMeta(type):
+    # Incremented each time a class is created, to resolve again field
+    # types given by name.
+    generation = 0
+
     def __new__(cls, name, bases, attrs):
         fields = [(field_name, attrs.pop(field_name)) for field_name, obj in attrs.items() if isinstance(obj, Field)]
         fields.sort(key=lambda x: x[1]._creation_counter)
@@ -287,9 +396,29 @@ class _BaseObjectMeta(type):
         if new_class._fields is None:
             new_class._fields = OrderedDict()
         else:
-            new_class._fields = deepcopy(new_class._fields)
+            # Field objects are only metadata, shared by every subclass.
+            new_class._fields = copy(new_class._fields)
         new_class._fields.update(fields)
 
+        new_class._layout = {}
+        new_class._defaults = []
+        new_class._mutable_defaults = []
+        for index, (field_name, field) in enumerate(new_class._fields.iteritems()):
+            new_class._layout[field_name] = index
+            new_class._defaults.append(field.value)
+            if not isinstance(field.value, _IMMUTABLE_TYPES):
+                new_class._mutable_defaults.append(index)
+
+            # Do not hide a property or a method defined with the field name.
+            for klass in new_class.__mro__:
+                if field_name in klass.__dict__:
+                    current = klass.__dict__[field_name]
+                    break
+            else:
+                current = None
+            if current is None or isinstance(current, _FieldSlot) and current.index != index:
+                setattr(new_class, field_name, _FieldSlot(field_name, index))
+
         if new_class.__doc__ is None:
             new_class.__doc__ = ''
         for name, field in fields:
@@ -297,6 +426,7 @@ class _BaseObjectMeta(type):
             if field.value is not NotLoaded:
                 doc += ' (default: %s)' % field.value
             new_class.__doc__ += '\n:var %s: %s' % (name, doc)
+        _BaseObjectMeta.generation += 1
         return new_class
 
 
@@ -326,6 +456,12 @@ class BaseObject(object):
 
     __metaclass__ = _BaseObjectMeta
 
+    DEBUG_CONVERSIONS = False
+    """
+    If True, emit a :class:`ConversionWarning` each time a value is
+    converted to the type of its field.
+    """
+
     id = None
     backend = None
     _fields = None
@@ -333,7 +469,22 @@ class BaseObject(object):
     def __init__(self, id=u'', backend=None):
         self.id = to_unicode(id)
         self.backend = backend
-        self._fields = deepcopy(self._fields)
+        if '_values' not in self.__dict__:
+            self._init_values()
+
+    def _init_values(self):
+        """
+        Set every field to its default value.
+
+        Field values are stored in a flat list, in the order of
+        :attr:`_fields`, whose :class:`Field` objects are shared by every
+        instance of the class.
+        """
+        values = list(self._defaults)
+        for index in self._mutable_defaults:
+            values[index] = deepcopy(values[index])
+        object.__setattr__(self, '_values', values)
+        return values
 
     @property
     def fullid(self):
@@ -359,7 +510,8 @@ class BaseObject(object):
 
     def copy(self):
         obj = copy(self)
-        obj._fields = copy(self._fields)
+        if '_values' in self.__dict__:
+            object.__setattr__(obj, '_values', list(self._values))
         return obj
 
     def __deepcopy__(self, memo):
@@ -387,8 +539,13 @@ class BaseObject(object):
 
         if hasattr(self, 'id') and self.id is not None:
             yield 'id', self.id
-        for name, field in self._fields.iteritems():
-            yield name, field.value
+        try:
+            values = self._values
+        except AttributeError:
+            values = self._init_values()
+        for name, value in izip(self._fields, values):
+            if value is not _Deleted:
+                yield name, value
 
     def __eq__(self, obj):
         if isinstance(obj, BaseObject):
@@ -396,18 +553,11 @@ class BaseObject(object):
         else:
             return False
 
-    def __getattr__(self, name):
-        if self._fields is not None and name in self._fields:
-            return self._fields[name].value
-        else:
-            raise AttributeError("'%s' object has no attribute '%s'" % (
-                self.__class__.__name__, name))
-
     def __setattr__(self, name, value):
         try:
             attr = (self._fields or {})[name]
         except KeyError:
-            if name not in dir(self) and not name.startswith('_'):
+            if not name.startswith('_') and name not in self.__dict__ and not hasattr(type(self), name):
                 warnings.warn('Creating a non-field attribute %s. Please prefix it with _' % name,
                               AttributeCreationWarning, stacklevel=2)
             object.__setattr__(self, name, value)
@@ -417,7 +567,7 @@ class BaseObject(object):
                     # Try to convert value to the wanted one.
                     nvalue = attr.convert(value)
                     # If the value was converted
-                    if nvalue is not value:
+                    if nvalue is not value and self.DEBUG_CONVERSIONS:
                         warnings.warn('Value %s was converted from %s to %s' %
                                       (name, type(value), type(nvalue)),
                                       ConversionWarning, stacklevel=2)
@@ -427,42 +577,31 @@ class BaseObject(object):
                     # match the wanted following types, so we'll
                     # raise ValueError.
                     pass
-            from collections import deque
-            actual_types=()
-            for v in attr.types:
-                if isinstance(v,str):
-                    # the following is a (almost) copy/paste from
-                    # https://stackoverflow.com/questions/11775460/lexical-cast-from-string-to-type
-                    q=deque([object])
-                    while q:
-                        t=q.popleft()
-                        if t.__name__ == v:
-                            actual_types+=(t,)
-                        else:
-                            try:
-                                # keep looking!
-                                q.extend(t.__subclasses__())
-                            except TypeError:
-                                # type.__subclasses__ needs an argument for
-                                # whatever reason.
-                                if t is type:
-                                    continue
-                                else:
-                                    raise
-                else:
-                    actual_types+=(v,)
-
-            if not isinstance(value, actual_types) and not empty(value):
-                raise ValueError(
-                    'Value for "%s" needs to be of type %r, not %r' % (
-                        name, actual_types, type(value)))
-            attr.value = value
+            if not empty(value):
+                actual_types = attr.get_types()
+                if not isinstance(value, actual_types):
+                    raise ValueError(
+                        'Value for "%s" needs to be of type %r, not %r' % (
+                            name, actual_types, type(value)))
+            try:
+                values = self._values
+            except AttributeError:
+                values = self._init_values()
+            values[self._layout[name]] = attr.normalize(value)
 
     def __delattr__(self, name):
         try:
-            self._fields.pop(name)
+            index = self._layout[name]
         except KeyError:
             object.__delattr__(self, name)
+        else:
+            try:
+                values = self._values
+            except AttributeError:
+                values = self._init_values()
+            if values[index] is _Deleted:
+                raise AttributeError(name)
+            values[index] = _Deleted
 
     def to_dict(self):
         def iter_decorate(d):
@@ -483,6 +622,93 @@ class BaseObject(object):
 
         return self
 
+    @classmethod
+    def to_columns(cls, objects, fields=None):
+        """
+        Export objects of this class as columns, one per field, without
+        building a dict for each object.
+
+        The 'id' column contains the same value than in :func:`to_dict`.
+
+        :param objects: objects to export
+        :type objects: iter[:class:`BaseObject`]
+        :param fields: names of fields to export. If None or empty, 'id'
+                       and every field are exported, like with formatters
+        :type fields: list
+        :rtype: :class:`OrderedDict` of :class:`Column`
+        """
+        objects = list(objects)
+
+        if cls.to_dict.im_func is not BaseObject.to_dict.im_func or \
+           cls.iter_fields.im_func is not BaseObject.iter_fields.im_func:
+            # Fields are customized by the class, use them.
+            rows = [obj.to_dict() for obj in objects]
+            names = OrderedDict((name, None) for row in rows for name in row).keys()
+            names = [name for name in names if not fields or name in fields]
+            return OrderedDict((name, Column(name, [row.get(name, NotLoaded) for row in rows],
+                                             cls._fields.get(name)))
+                               for name in names)
+
+        names = ['id'] + list(cls._fields)
+        if fields:
+            names = [name for name in names if name in fields]
+
+        rows = []
+        for obj in objects:
+            if type(obj) is cls:
+                try:
+                    rows.append(obj._values)
+                except AttributeError:
+                    rows.append(obj._init_values())
+            elif isinstance(obj, cls):
+                rows.append([getattr(obj, name, NotLoaded) for name in cls._fields])
+            else:
+                raise TypeError('%r is not a %s object' % (obj, cls.__name__))
+        values = zip(*rows) if rows else [()] * len(cls._fields)
+
+        columns = OrderedDict()
+        for name in names:
+            if name == 'id':
+                column = [obj.id if obj.backend is None else obj.fullid for obj in objects]
+                columns[name] = Column(name, column)
+            else:
+                column = values[cls._layout[name]]
+                if any(value is _Deleted for value in column):
+                    # Like to_dict(), which skips deleted fields.
+                    column = [NotLoaded if value is _Deleted else value for value in column]
+                columns[name] = Column(name, column, cls._fields[name])
+        return columns
+
+
+class Column(list):
+    """
+    Values of a field, for a list of objects.
+
+    Columns of :class:`IntField`, :class:`FloatField` and
+    :class:`DecimalField` fields are typed: their values are empty or
+    instances of :attr:`type`.
+
+    :param name: name of the field
+    :type name: :class:`str`
+    :param values: values of the field
+    :type values: list
+    :param field: field definition, if known
+    :type field: :class:`Field`
+    """
+
+    def __init__(self, name, values, field=None):
+        list.__init__(self, values)
+        self.name = name
+        self.field = field
+        if isinstance(field, IntField):
+            self.type = int
+        elif isinstance(field, FloatField):
+            self.type = float
+        elif isinstance(field, DecimalField):
+            self.type = Decimal
+        else:
+            self.type = None
+
 
 class Currency(object):
     CURRENCIES = {u'EUR': u'€',
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import pickle
+from copy import deepcopy
+from unittest import TestCase
+
+from weboob.capabilities.base import BaseObject, Field, IntField, StringField, NotLoaded
+
+
+class Item(BaseObject):
+    title = StringField('Title')
+    count = IntField('Count', default=0)
+    tags = Field('Tags', list, default=[])
+    options = Field('Options', dict, default={})
+
+
+class SubItem(Item):
+    extra = StringField('Extra', default=u'')
+
+
+# Class that tests storage of fields values in a flat list of values
+class FieldsStorageTest(TestCase):
+
+    def test_defaults(self):
+        item = SubItem(u'1')
+        self.assertIs(item.title, NotLoaded)
+        self.assertEquals(item.count, 0)
+        self.assertEquals(item.extra, u'')
+        self.assertEquals([name for name, value in item.iter_fields()],
+                          ['id', 'title', 'count', 'tags', 'options', 'extra'])
+
+    def test_mutable_defaults(self):
+        a, b = Item(), Item()
+        a.tags.append(u'foo')
+        a.options['bar'] = 1
+        self.assertEquals(b.tags, [])
+        self.assertEquals(b.options, {})
+        self.assertEquals(Item().tags, [])
+
+    def test_set(self):
+        item = Item()
+        item.count = '42'
+        self.assertEquals(item.count, 42)
+        self.assertRaises(ValueError, setattr, item, 'tags', u'foo')
+        # Values of an object are not shared with another one.
+        self.assertIs(Item().count, 0)
+
+    def test_del(self):
+        item = Item(u'1')
+        del item.title
+        self.assertRaises(AttributeError, getattr, item, 'title')
+        self.assertFalse(hasattr(item, 'title'))
+        self.assertRaises(AttributeError, delattr, item, 'title')
+        self.assertNotIn('title', dict(item.iter_fields()))
+        self.assertNotIn('title', item.to_dict())
+
+        item.title = u'foo'
+        self.assertEquals(item.title, u'foo')
+
+    def test_copy(self):
+        item = Item(u'1')
+        item.title = u'foo'
+        item.tags.append(u'a')
+        del item.count
+
+        for other in (item.copy(), deepcopy(item)):
+            other.title = u'bar'
+            other.count = 1
+            self.assertEquals(item.title, u'foo')
+            self.assertFalse(hasattr(item, 'count'))
+            self.assertEquals(other.tags, [u'a'])
+
+    def test_to_dict(self):
+        item = Item(u'1', backend='test')
+        item.title = u'foo'
+        self.assertEquals(item.to_dict().items(),
+                          [('id', u'1@test'), ('title', u'foo'), ('count', 0), ('tags', []), ('options', {})])
+
+    def test_pickle(self):
+        item = SubItem(u'1', backend='test')
+        item.title = u'foo'
+        item.tags.append(u'a')
+        del item.extra
+
+        other = pickle.loads(pickle.dumps(item, pickle.HIGHEST_PROTOCOL))
+        self.assertEquals(other.fullid, u'1@test')
+        self.assertEquals(other.title, u'foo')
+        self.assertEquals(other.tags, [u'a'])
+        self.assertFalse(hasattr(other, 'extra'))
+        other.count = 2
+        self.assertEquals(item.count, 0)
+
+
+# Class that tests resolution of field types given by name
+class FieldTypesTest(TestCase):
+
+    def test_get_types(self):
+        field = Field('Later', 'FieldTypesTestLater', int)
+        self.assertEquals(field.get_types(), (int,))
+
+        class FieldTypesTestLater(BaseObject):
+            pass
+
+        # The class was defined after the first resolution.
+        self.assertEquals(field.get_types(), (FieldTypesTestLater, int))
+
+        class Linked(BaseObject):
+            later = Field('Later', 'FieldTypesTestLater')
+
+        obj = Linked()
+        obj.later = FieldTypesTestLater()
+        self.assertRaises(ValueError, setattr, obj, 'later', 42)
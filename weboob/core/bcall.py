@@ -19,7 +19,8 @@
 
 
 from copy import copy
-from threading import Thread
+from threading import Thread, RLock, Condition
+from time import time
 try:
     import Queue
 except ImportError:
@@ -30,7 +31,7 @@ from weboob.tools.misc import get_backtrace
 from weboob.tools.log import getLogger
 
 
-__all__ = ['BackendsCall', 'CallErrors']
+__all__ = ['BackendsCall', 'CallErrors', 'BackendTimeout']
 
 
 class CallErrors(Exception):
@@ -46,34 +47,146 @@ class CallErrors(Exception):
         return self.errors.__iter__()
 
 
+class BackendTimeout(Exception):
+    """
+    Reported in :class:`CallErrors` for a backend which did not finish
+    before the deadline of the call.
+    """
+
+
+class _BackendDone(object):
+    # Posted in responses by workers when a backend is done.
+    def __init__(self, backend):
+        self.backend = backend
+
+
+# Posted in responses by cancel() to wake up a blocked consumer.
+_CANCELLED = object()
+
+
 class BackendsCall(object):
-    def __init__(self, backends, function, *args, **kwargs):
+    def __init__(self, backends, function, args=(), kwargs=None, pool=None, max_workers=None,
+                 timeout=None, per_backend_timeout=None, queue_size=None):
         """
         :param backends: List of backends to call
         :type backends: list[:class:`Module`]
         :param function: backends' method name, or callable object.
         :type function: :class:`str` or :class:`callable`
+        :param args: positional arguments given to function
+        :type args: :class:`tuple`
+        :param kwargs: keyword arguments given to function
+        :type kwargs: :class:`dict`
+        :param pool: pool of threads which run calls on backends. If None, a
+                     dedicated thread is started for each backend.
+        :type pool: :class:`weboob.core.pool.WorkerPool`
+        :param max_workers: maximum number of backends called at the same time
+        :type max_workers: :class:`int`
+        :param timeout: seconds after which backends still running are
+                        reported as :class:`BackendTimeout` errors, and
+                        results gathered so far are returned
+        :type timeout: :class:`float`
+        :param per_backend_timeout: same as timeout, but counted for each
+                                    backend from the moment it is called
+        :type per_backend_timeout: :class:`float`
+        :param queue_size: maximum number of results waiting to be consumed.
+                           When reached, backends are blocked until the
+                           consumer catches up. Unlimited if None.
+        :type queue_size: :class:`int`
         """
         self.logger = getLogger('bcall')
 
-        self.responses = Queue.Queue()
+        self.responses = Queue.Queue(queue_size or 0)
         self.errors = []
         self.tasks = Queue.Queue()
+        self.cancelled = False
+        self.wakeup = None
+
+        if kwargs is None:
+            kwargs = {}
+
+        self.mutex = RLock()
+        self.cond = Condition(self.mutex)
+        self.start = time()
+        self.deadline = self.start + timeout if timeout is not None else None
+        self.per_backend_timeout = per_backend_timeout
+        # when each backend has been called
+        self.started = {}
+        # backends not finished nor timed out
+        self.pending = set(backends)
+        self.timedout = set()
 
+        # number of backends the consumer still waits for
+        self.remaining = len(backends)
         for backend in backends:
-            Thread(target=self.backend_process, args=(function, args, kwargs)).start()
             self.tasks.put(backend)
 
+        nb_workers = len(backends)
+        if max_workers is not None:
+            nb_workers = min(nb_workers, max_workers)
+
+        for _ in xrange(nb_workers):
+            if pool is None:
+                Thread(target=self.worker_run, args=(function, args, kwargs)).start()
+            else:
+                pool.submit(self.worker_run, function, args, kwargs)
+
+    def worker_run(self, function, args, kwargs):
+        """
+        Call function on backends until there is no more backend to process.
+        """
+        while not self.cancelled:
+            try:
+                backend = self.tasks.get_nowait()
+            except Queue.Empty:
+                return
+
+            self.backend_process(backend, function, args, kwargs)
+
     def store_result(self, backend, result):
         if result is None:
             return
 
         if isinstance(result, BaseObject):
             result.backend = backend.name
-        self.responses.put(result)
+        self._put_response(result, backend)
+
+    def _store_error(self, backend, error, backtrace):
+        with self.mutex:
+            if backend not in self.timedout:
+                self.errors.append((backend, error, backtrace))
+
+    def _put_response(self, response, backend):
+        while True:
+            # The check and the put are atomic with _check_deadlines(), so
+            # nothing from a backend is queued after its timeout is reported.
+            with self.mutex:
+                if self.cancelled or backend in self.timedout:
+                    return
+                try:
+                    self.responses.put_nowait(response)
+                except Queue.Full:
+                    pass
+                else:
+                    break
+
+            # Wait outside of the mutex for the consumer to catch up, as it
+            # needs the mutex to check deadlines.
+            with self.responses.not_full:
+                if len(self.responses.queue) >= self.responses.maxsize:
+                    self.responses.not_full.wait(0.1)
+
+        if self.wakeup is not None:
+            self.wakeup()
+
+    def backend_process(self, backend, function, args, kwargs):
+        with self.mutex:
+            if backend not in self.pending:
+                # timed out before being called
+                self.tasks.task_done()
+                return
+
+            self.started[backend] = time()
 
-    def backend_process(self, function, args, kwargs):
-        backend = self.tasks.get()
         with backend:
             try:
                 # Call method on backend
@@ -85,7 +198,7 @@ class BackendsCall(object):
                         result = getattr(backend, function)(*args, **kwargs)
                 except Exception as error:
                     self.logger.debug('%s: Called function %s raised an error: %r', backend, function, error)
-                    self.errors.append((backend, error, get_backtrace(error)))
+                    self._store_error(backend, error, get_backtrace(error))
                 else:
                     self.logger.debug('%s: Called function %s returned: %r', backend, function, result)
 
@@ -93,23 +206,91 @@ class BackendsCall(object):
                         # Loop on iterator
                         try:
                             for subresult in result:
+                                if self.cancelled or backend in self.timedout:
+                                    break
                                 self.store_result(backend, subresult)
                         except Exception as error:
-                            self.errors.append((backend, error, get_backtrace(error)))
+                            self._store_error(backend, error, get_backtrace(error))
                     else:
                         self.store_result(backend, result)
             finally:
+                with self.mutex:
+                    timedout = backend in self.timedout
+                    self.pending.discard(backend)
+                    self.cond.notify_all()
+                if not timedout:
+                    self._put_response(_BackendDone(backend), backend)
                 self.tasks.task_done()
 
-    def _callback_thread_run(self, callback, errback, finishback):
-        while self.tasks.unfinished_tasks or not self.responses.empty():
+    def _check_deadlines(self):
+        """
+        Report backends which overran their deadline.
+
+        :returns: seconds until the next deadline, or None
+        """
+        if self.cancelled or (self.deadline is None and self.per_backend_timeout is None):
+            return None
+
+        now = time()
+        next_deadline = None
+        with self.mutex:
+            for backend in list(self.pending):
+                deadline = self.deadline
+                if self.per_backend_timeout is not None and backend in self.started:
+                    backend_deadline = self.started[backend] + self.per_backend_timeout
+                    if deadline is None or backend_deadline < deadline:
+                        deadline = backend_deadline
+                if deadline is None:
+                    continue
+
+                if deadline <= now:
+                    elapsed = now - self.started.get(backend, self.start)
+                    self.logger.debug('%s: timed out after %.1f seconds', backend, elapsed)
+                    self.pending.discard(backend)
+                    self.timedout.add(backend)
+                    self.errors.append((backend, BackendTimeout('timed out after %.1f seconds' % elapsed), ''))
+                    self.remaining -= 1
+                elif next_deadline is None or deadline < next_deadline:
+                    next_deadline = deadline
+
+        if next_deadline is None:
+            return None
+        return next_deadline - now
+
+    def _handle_response(self, response):
+        if response is _CANCELLED:
+            return False
+        if not isinstance(response, _BackendDone):
+            return True
+
+        with self.mutex:
+            if response.backend not in self.timedout:
+                self.remaining -= 1
+        return False
+
+    def _iter_responses(self):
+        """
+        Block until results come, and stop as soon as every backend is done
+        or timed out.
+        """
+        while self.remaining > 0 and not self.cancelled:
+            timeout = self._check_deadlines()
+            if self.remaining <= 0:
+                break
+
             try:
-                response = self.responses.get(timeout=0.1)
-                if callback:
-                    callback(response)
+                response = self.responses.get(timeout=timeout)
             except Queue.Empty:
                 continue
 
+            if self._handle_response(response):
+                yield response
+
+    def _callback_thread_run(self, callback, errback, finishback):
+        for response in self._iter_responses():
+            if callback:
+                callback(response)
+
         # Raise errors
         while errback and self.errors:
             errback(*self.errors.pop(0))
@@ -135,18 +316,108 @@ class BackendsCall(object):
         thread.start()
         return thread
 
-    def wait(self):
-        self.tasks.join()
+    def set_wakeup(self, wakeup):
+        """
+        Set a function called, from workers threads, every time a new
+        result comes or a backend is done.
+
+        It allows an event loop to be notified (for example by writing in a
+        pipe it watches) and to call :func:`iter_ready` instead of
+        dedicating a thread to a blocking iteration. The function is called
+        immediately if results are already waiting. Note that it is not
+        called when a timeout expires.
+
+        :param wakeup: function without argument, or None to unset it
+        :type wakeup: :class:`callable`
+        """
+        self.wakeup = wakeup
+        if wakeup is not None and not self.responses.empty():
+            wakeup()
+
+    def iter_ready(self):
+        """
+        Iterate on results already received, without blocking.
+
+        When every backend is done, errors are raised as :class:`CallErrors`.
+        """
+        self._check_deadlines()
+        while self.remaining > 0 and not self.cancelled:
+            try:
+                response = self.responses.get_nowait()
+            except Queue.Empty:
+                return
+
+            if self._handle_response(response):
+                yield response
 
         if self.errors:
             raise CallErrors(self.errors)
 
-    def __iter__(self):
-        while self.tasks.unfinished_tasks or not self.responses.empty():
+    @property
+    def done(self):
+        """
+        True when every backend is done and every result has been consumed.
+        """
+        return self.remaining == 0 or self.cancelled
+
+    def cancel(self):
+        """
+        Cancel the call.
+
+        Backends not started yet are not called, running ones stop at their
+        next result, and iteration stops.
+        """
+        with self.mutex:
+            self.cancelled = True
+            self.remaining = 0
             try:
-                yield self.responses.get(timeout=0.1)
+                self.responses.put_nowait(_CANCELLED)
+            except Queue.Full:
+                # The consumer is not blocked, and stops at its next get.
+                pass
+
+        while True:
+            try:
+                backend = self.tasks.get_nowait()
             except Queue.Empty:
-                continue
+                break
+            with self.mutex:
+                self.pending.discard(backend)
+                self.cond.notify_all()
+            self.tasks.task_done()
+
+        if self.wakeup is not None:
+            self.wakeup()
+
+    def wait(self):
+        """
+        Wait for every backend to be done, and raise errors.
+
+        If the results queue is bounded, results are consumed and discarded,
+        as backends would else be blocked on a full queue.
+        """
+        if self.responses.maxsize > 0:
+            for _ in self._iter_responses():
+                pass
+        else:
+            with self.mutex:
+                while self.pending:
+                    timeout = self._check_deadlines()
+                    if self.pending:
+                        self.cond.wait(timeout)
+
+        if self.errors:
+            raise CallErrors(self.errors)
+
+    def __iter__(self):
+        try:
+            for response in self._iter_responses():
+                yield response
+        except GeneratorExit:
+            # The consumer stopped iterating, there is no need to keep
+            # backends running (or blocked on a full queue).
+            self.cancel()
+            raise
 
         if self.errors:
             raise CallErrors(self.errors)
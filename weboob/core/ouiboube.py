@@ -23,6 +23,7 @@ import os
 from weboob.core.bcall import BackendsCall
 from weboob.core.modules import ModulesLoader, RepositoryModulesLoader, ModuleLoadError
 from weboob.core.backendscfg import BackendsConfig
+from weboob.core.pool import PoolStopped, WorkerPool
 from weboob.core.repositories import Repositories, PrintProgress
 from weboob.core.scheduler import Scheduler
 from weboob.tools.backend import Module
@@ -50,10 +51,13 @@ class WebNip(object):
     :type storage: :class:`weboob.tools.storage.IStorage`
     :param scheduler: what scheduler to use; default is :class:`weboob.core.scheduler.Scheduler`
     :type scheduler: :class:`weboob.core.scheduler.IScheduler`
+    :param pool_size: maximum number of threads used to call backends; default
+                      is read from the WEBOOB_POOL_SIZE environment variable
+    :type pool_size: :class:`int`
     """
     VERSION = '1.1'
 
-    def __init__(self, modules_path=None, storage=None, scheduler=None):
+    def __init__(self, modules_path=None, storage=None, scheduler=None, pool_size=None):
         self.logger = getLogger('weboob')
         self.backend_instances = {}
         self.callbacks = {'login':   lambda backend_name, value: None,
@@ -71,6 +75,8 @@ class WebNip(object):
             scheduler = Scheduler()
         self.scheduler = scheduler
 
+        self.pool = WorkerPool(pool_size)
+
         self.storage = storage
 
     def __deinit__(self):
@@ -80,8 +86,13 @@ class WebNip(object):
         """
         Call this method when you stop using Weboob, to
         properly unload all correctly.
+
+        Backend calls which are still running are not waited for, but they
+        are before the interpreter exits. :func:`do` can not be called
+        anymore.
         """
         self.unload_backends()
+        self.pool.shutdown(wait=False)
 
     def build_backend(self, module_name, params=None, storage=None, name=None):
         """
@@ -233,8 +244,26 @@ class WebNip(object):
         :type backends: list[:class:`str`]
         :param caps: iterate on backends which implement this caps
         :type caps: list[:class:`weboob.capabilities.base.Capability`]
+        :param max_workers: maximum number of backends called at the same time
+        :type max_workers: :class:`int`
+        :param timeout: seconds after which results gathered so far are
+                        returned, and backends still running are reported as
+                        :class:`weboob.core.bcall.BackendTimeout` errors
+        :type timeout: :class:`float`
+        :param per_backend_timeout: same as timeout, counted for each backend
+                                    from the moment it is called
+        :type per_backend_timeout: :class:`float`
+        :param queue_size: maximum number of results waiting to be consumed;
+                           backends are blocked when it is reached, so memory
+                           does not grow with the number of results
+        :type queue_size: :class:`int`
         :rtype: A :class:`weboob.core.bcall.BackendsCall` object (iterable)
+        :raises: :class:`weboob.core.pool.PoolStopped` if :func:`deinit` has
+                 been called
         """
+        if self.pool.stopped:
+            raise PoolStopped('Unable to call %r: Weboob has been deinitialized' % function)
+
         backends = self.backend_instances.values()
         _backends = kwargs.pop('backends', None)
         if _backends is not None:
@@ -263,13 +292,20 @@ class WebNip(object):
             caps = kwargs.pop('caps')
             backends = [backend for backend in backends if backend.has_caps(caps)]
 
+        max_workers = kwargs.pop('max_workers', None)
+        timeout = kwargs.pop('timeout', None)
+        per_backend_timeout = kwargs.pop('per_backend_timeout', None)
+        queue_size = kwargs.pop('queue_size', None)
+
         # The return value MUST BE the BackendsCall instance. Please never iterate
         # here on this object, because caller might want to use other methods, like
         # wait() on callback_thread().
         # Thanks a lot.
-        return BackendsCall(backends, function, *args, **kwargs)
+        return BackendsCall(backends, function, args, kwargs, pool=self.pool, max_workers=max_workers,
+                            timeout=timeout, per_backend_timeout=per_backend_timeout,
+                            queue_size=queue_size)
 
-    def schedule(self, interval, function, *args):
+    def schedule(self, interval, function, *args, **kwargs):
         """
         Schedule an event.
 
@@ -278,11 +314,12 @@ class WebNip(object):
         :param function: function to call
         :type function: callabale
         :param args: arguments to give to function
+        :param kwargs: options of the scheduler (see :class:`weboob.core.scheduler.Scheduler`)
         :returns: an event identificator
         """
-        return self.scheduler.schedule(interval, function, *args)
+        return self.scheduler.schedule(interval, function, *args, **kwargs)
 
-    def repeat(self, interval, function, *args):
+    def repeat(self, interval, function, *args, **kwargs):
         """
         Repeat a call to a function
 
@@ -291,9 +328,10 @@ class WebNip(object):
         :param function: function to call
         :type function: callable
         :param args: arguments to give to function
+        :param kwargs: options of the scheduler (see :class:`weboob.core.scheduler.Scheduler`)
         :returns: an event identificator
         """
-        return self.scheduler.repeat(interval, function, *args)
+        return self.scheduler.repeat(interval, function, *args, **kwargs)
 
     def cancel(self, ev):
         """
@@ -330,11 +368,13 @@ class Weboob(WebNip):
     :type backends_filename: str
     :param storage: provide a storage where backends can save data
     :type storage: :class:`weboob.tools.storage.IStorage`
+    :param pool_size: maximum number of threads used to call backends
+    :type pool_size: :class:`int`
     """
     BACKENDS_FILENAME = 'backends'
 
-    def __init__(self, workdir=None, datadir=None, backends_filename=None, scheduler=None, storage=None):
-        super(Weboob, self).__init__(modules_path=False, scheduler=scheduler, storage=storage)
+    def __init__(self, workdir=None, datadir=None, backends_filename=None, scheduler=None, storage=None, pool_size=None):
+        super(Weboob, self).__init__(modules_path=False, scheduler=scheduler, storage=storage, pool_size=pool_size)
 
         # Create WORKDIR
         if workdir is None:
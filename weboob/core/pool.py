@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+
+import atexit
+import os
+from threading import Thread, Lock, current_thread
+from weakref import WeakSet
+try:
+    import Queue
+except ImportError:
+    import queue as Queue
+
+from weboob.tools.log import getLogger
+from weboob.tools.misc import get_backtrace
+
+
+__all__ = ['PoolStopped', 'WorkerPool']
+
+
+class PoolStopped(RuntimeError):
+    """
+    Raised when a job is submitted to a pool which has been shut down.
+    """
+
+
+class WorkerPool(object):
+    """
+    Bounded pool of threads which run submitted jobs.
+
+    Threads are started lazily, only when no idle worker is available, and
+    are kept alive to be reused by next jobs.
+
+    Workers are daemon threads, so idle ones do not prevent the interpreter
+    from exiting. Jobs which are still running at exit are waited for, even
+    if :func:`shutdown` has been called with wait=False.
+
+    :param size: maximum number of threads. If None, the WEBOOB_POOL_SIZE
+                 environment variable is read, or :attr:`DEFAULT_SIZE` is used.
+    :type size: :class:`int`
+    """
+    DEFAULT_SIZE = 20
+
+    def __init__(self, size=None):
+        if size is None:
+            size = int(os.environ.get('WEBOOB_POOL_SIZE', self.DEFAULT_SIZE))
+        assert size > 0, 'Size of the pool must be positive'
+
+        self.logger = getLogger('pool')
+        self.size = size
+        self.jobs = Queue.Queue()
+        self.threads = []
+        self.extra_threads = []
+        self.idle = 0
+        self.mutex = Lock()
+        self.stopped = False
+        _pools.add(self)
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Run a function in a worker of the pool.
+
+        If called from a worker of this pool (for example a backend which
+        calls :func:`weboob.core.ouiboube.WebNip.do`), the job is run in a
+        dedicated thread, as waiting for it from a busy worker could
+        exhaust the pool and dead-lock.
+
+        :raises: :class:`PoolStopped` if :func:`shutdown` has been called
+        """
+        if current_thread() in self.threads:
+            if self.stopped:
+                raise PoolStopped('Unable to submit %r: pool is stopped' % function)
+            thread = Thread(target=self._run_job, args=(function, args, kwargs))
+            thread.daemon = True
+            with self.mutex:
+                self.extra_threads.append(thread)
+            thread.start()
+            return
+
+        with self.mutex:
+            if self.stopped:
+                raise PoolStopped('Unable to submit %r: pool is stopped' % function)
+            # Pending jobs will be taken by idle workers first.
+            if self.jobs.qsize() >= self.idle and len(self.threads) < self.size:
+                thread = Thread(target=self._worker_run, name='WorkerPool-%d' % len(self.threads))
+                thread.daemon = True
+                self.threads.append(thread)
+                thread.start()
+            self.jobs.put((function, args, kwargs))
+
+    def _run_job(self, function, args, kwargs):
+        try:
+            function(*args, **kwargs)
+        except Exception:
+            self.logger.error('Job %r raised an exception:\n%s', function, get_backtrace())
+        finally:
+            thread = current_thread()
+            if thread in self.extra_threads:
+                with self.mutex:
+                    self.extra_threads.remove(thread)
+
+    def _worker_run(self):
+        while True:
+            with self.mutex:
+                self.idle += 1
+            job = self.jobs.get()
+            with self.mutex:
+                self.idle -= 1
+
+            if job is None:
+                break
+
+            self._run_job(*job)
+
+    def shutdown(self, wait=True):
+        """
+        Stop workers once pending jobs are done.
+
+        :param wait: if True, block until every worker has stopped
+        :type wait: :class:`bool`
+        """
+        with self.mutex:
+            self.stopped = True
+            threads = list(self.threads)
+            for _ in threads:
+                self.jobs.put(None)
+
+        if wait:
+            self.join()
+
+    def join(self):
+        """
+        Block until every worker has stopped.
+
+        Does not return before :func:`shutdown` has been called.
+        """
+        with self.mutex:
+            threads = self.threads + self.extra_threads
+        for thread in threads:
+            if thread is not current_thread():
+                thread.join()
+
+
+_pools = WeakSet()
+
+
+@atexit.register
+def _join_pools():
+    # atexit handlers are run once non-daemon threads are finished, but
+    # before daemon threads are killed: let running backend calls end, as
+    # they did when they were run by non-daemon threads.
+    for pool in list(_pools):
+        pool.shutdown(wait=True)
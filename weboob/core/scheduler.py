@@ -20,12 +20,12 @@
 
 from __future__ import print_function
 
-from threading import Event, RLock
-try:
-    from threading import _Timer as Timer
-except ImportError:
-    from threading import Timer
+import heapq
+import random
+from threading import Event, RLock, Condition, Thread
+from time import time
 
+from weboob.core.pool import WorkerPool
 from weboob.tools.log import getLogger
 from weboob.tools.misc import get_backtrace
 
@@ -34,10 +34,10 @@ __all__ = ['Scheduler']
 
 
 class IScheduler(object):
-    def schedule(self, interval, function, *args):
+    def schedule(self, interval, function, *args, **kwargs):
         raise NotImplementedError()
 
-    def repeat(self, interval, function, *args):
+    def repeat(self, interval, function, *args, **kwargs):
         raise NotImplementedError()
 
     def cancel(self, ev):
@@ -50,58 +50,157 @@ class IScheduler(object):
         raise NotImplementedError()
 
 
-class RepeatedTimer(Timer):
-    def run(self):
-        while not self.finished.isSet():
-            try:
-                self.function(*self.args, **self.kwargs)
-            except Exception:
-                # do not stop timer because of an exception
-                print(get_backtrace())
-            self.finished.wait(self.interval)
-        self.finished.set()
+class ScheduledEvent(object):
+    def __init__(self, count, interval, function, args, repeat, jitter, missed):
+        self.count = count
+        self.interval = interval
+        self.function = function
+        self.args = args
+        self.repeat = repeat
+        self.jitter = jitter
+        self.missed = missed
+        self.tick = None
+        self.deadline = None
+
+    def __repr__(self):
+        return '<ScheduledEvent %d: %s>' % (self.count, self.function.__name__)
 
 
 class Scheduler(IScheduler):
-    def __init__(self):
+    """
+    Scheduler running every events from a single dispatcher thread, which
+    sleeps until the nearest deadline and gives due callbacks to a pool
+    of workers.
+
+    A repeated event is never run concurrently with itself. When a call
+    lasts longer than the interval, the *missed* policy decides what to
+    do with the ticks which should have happened meanwhile:
+
+    * :attr:`MISSED_DELAY`: wait for the interval after the end of the
+      call (default);
+    * :attr:`MISSED_SKIP`: skip missed ticks, and call at the next tick;
+    * :attr:`MISSED_CATCHUP`: call immediately for every missed tick.
+
+    :param pool_size: maximum number of callbacks run at the same time
+    :type pool_size: :class:`int`
+    :param jitter: default maximum number of seconds randomly added to
+                   each deadline, to avoid events firing all together
+    :type jitter: :class:`float`
+    :param missed: default missed ticks policy of repeated events
+    :type missed: :class:`str`
+    """
+    MISSED_DELAY = 'delay'
+    MISSED_SKIP = 'skip'
+    MISSED_CATCHUP = 'catchup'
+
+    def __init__(self, pool_size=None, jitter=0, missed=MISSED_DELAY):
         self.logger = getLogger('scheduler')
         self.mutex = RLock()
+        self.cond = Condition(self.mutex)
         self.stop_event = Event()
         self.count = 0
         self.queue = {}
-
-    def schedule(self, interval, function, *args):
-        return self._schedule(Timer, interval, self._schedule_callback, function, *args)
-
-    def repeat(self, interval, function, *args):
-        return self._schedule(RepeatedTimer, interval, self._repeat_callback, function, *args)
-
-    def _schedule(self, klass, interval, meta_func, function, *args):
+        self.heap = []
+        self.jitter = jitter
+        self.missed = missed
+        self.pool = WorkerPool(pool_size)
+        self.dispatcher = None
+
+    def schedule(self, interval, function, *args, **kwargs):
+        """
+        Call a function once after interval seconds.
+
+        The *jitter* keyword argument overrides the scheduler's default.
+        """
+        return self._schedule(interval, interval, function, args, False, **kwargs)
+
+    def repeat(self, interval, function, *args, **kwargs):
+        """
+        Call a function now, and then every interval seconds.
+
+        The *jitter* and *missed* keyword arguments override the scheduler's
+        defaults.
+        """
+        return self._schedule(0, interval, function, args, True, **kwargs)
+
+    def _schedule(self, delay, interval, function, args, repeat, jitter=None, missed=None):
         if self.stop_event.isSet():
             return
 
+        if jitter is None:
+            jitter = self.jitter
+        if missed is None:
+            missed = self.missed
+        assert missed in (self.MISSED_DELAY, self.MISSED_SKIP, self.MISSED_CATCHUP), 'Unknown missed ticks policy %r' % missed
+
         with self.mutex:
             self.count += 1
-            self.logger.debug('function "%s" will be called in %s seconds' % (function.__name__, interval))
-            timer = klass(interval, meta_func, (self.count, interval, function, args))
-            self.queue[self.count] = timer
-            timer.start()
-            return self.count
-
-    def _schedule_callback(self, count, interval, function, args):
+            self.logger.debug('function "%s" will be called in %s seconds' % (function.__name__, delay))
+            ev = ScheduledEvent(self.count, interval, function, args, repeat, jitter, missed)
+            self.queue[ev.count] = ev
+            self._push(ev, time() + delay)
+
+            if self.dispatcher is None:
+                self.dispatcher = Thread(target=self._dispatcher_run, name='Scheduler')
+                self.dispatcher.daemon = True
+                self.dispatcher.start()
+            return ev.count
+
+    def _push(self, ev, tick):
+        ev.tick = tick
+        ev.deadline = tick
+        if ev.jitter:
+            ev.deadline += random.uniform(0, ev.jitter)
+        heapq.heappush(self.heap, (ev.deadline, ev.count))
+        self.cond.notify()
+
+    def _dispatcher_run(self):
         with self.mutex:
-            self.queue.pop(count)
-        return function(*args)
+            while not self.stop_event.isSet():
+                if not self.heap:
+                    self.cond.wait()
+                    continue
+
+                deadline, count = self.heap[0]
+                now = time()
+                if deadline > now:
+                    self.cond.wait(deadline - now)
+                    continue
+
+                heapq.heappop(self.heap)
+                ev = self.queue.get(count)
+                # The event has been canceled.
+                if ev is None or ev.deadline != deadline:
+                    continue
+
+                if not ev.repeat:
+                    self.queue.pop(count)
+                self.pool.submit(self._run_event, ev)
+
+    def _run_event(self, ev):
+        try:
+            ev.function(*ev.args)
+        except Exception:
+            # do not stop repeated events because of an exception
+            print(get_backtrace())
+
+        if not ev.repeat:
+            return
 
-    def _repeat_callback(self, count, interval, function, args):
-        function(*args)
         with self.mutex:
-            try:
-                e = self.queue[count]
-            except KeyError:
+            if self.queue.get(ev.count) is not ev:
                 return
+
+            now = time()
+            if ev.missed == self.MISSED_DELAY:
+                tick = now + ev.interval
             else:
-                self.logger.debug('function "%s" will be called in %s seconds' % (function.__name__, e.interval))
+                tick = ev.tick + ev.interval
+                if ev.missed == self.MISSED_SKIP and tick < now and ev.interval > 0:
+                    tick += ev.interval * ((now - tick) // ev.interval + 1)
+
+            self.logger.debug('function "%s" will be called in %s seconds' % (ev.function.__name__, max(0, tick - now)))
+            self._push(ev, tick)
 
     def cancel(self, ev):
         with self.mutex:
@@ -109,21 +208,16 @@ class Scheduler(IScheduler):
                 e = self.queue.pop(ev)
             except KeyError:
                 return False
-            e.cancel()
             self.logger.debug('scheduled function "%s" is canceled' % e.function.__name__)
             return True
 
     def _wait_to_stop(self):
         self.want_stop()
-        with self.mutex:
-            for e in self.queue.itervalues():
-                e.cancel()
-                e.join()
-            self.queue = {}
+        self.pool.shutdown(wait=True)
 
     def run(self):
         try:
-            while True:
+            while not self.stop_event.isSet():
                 self.stop_event.wait(0.1)
         except KeyboardInterrupt:
             self._wait_to_stop()
@@ -135,8 +229,9 @@ class Scheduler(IScheduler):
     def want_stop(self):
         self.stop_event.set()
         with self.mutex:
-            for t in self.queue.itervalues():
-                t.cancel()
-                # Contrary to _wait_to_stop(), don't call t.join
-                # because want_stop() have to be non-blocking.
             self.queue = {}
+            self.heap = []
+            self.cond.notify()
+        # Contrary to _wait_to_stop(), don't wait for running callbacks
+        # because want_stop() have to be non-blocking.
+        self.pool.shutdown(wait=False)
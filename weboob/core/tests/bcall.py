@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import time
+from threading import Event, RLock, Thread
+from unittest import TestCase
+
+from weboob.core.bcall import BackendsCall, BackendTimeout, CallErrors
+from weboob.core.pool import PoolStopped, WorkerPool
+
+
+class FakeBackend(object):
+    def __init__(self, name):
+        self.name = name
+        self.lock = RLock()
+        # set when the backend returns or stops yielding
+        self.finished = Event()
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, t, v, tb):
+        self.lock.release()
+
+    def __repr__(self):
+        return '<FakeBackend %r>' % self.name
+
+    def iter_results(self, count=3, delay=0):
+        try:
+            time.sleep(delay)
+            for i in xrange(count):
+                yield '%s-%d' % (self.name, i)
+        finally:
+            self.finished.set()
+
+    def iter_endless(self):
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+                time.sleep(0.001)
+        finally:
+            self.finished.set()
+
+    def get_result(self, delay=0):
+        time.sleep(delay)
+        self.finished.set()
+        return self.name
+
+    def fail(self):
+        raise ValueError('broken')
+
+
+# Class that tests deadlines, bounded queues and cancellation of calls
+class BackendsCallTest(TestCase):
+
+    def setUp(self):
+        self.pool = WorkerPool(4)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def call(self, backends, function, *args, **kwargs):
+        return BackendsCall(backends, function, args, pool=self.pool, **kwargs)
+
+    def consume(self, call):
+        """
+        Iterate on results, and return them with errors of the call.
+        """
+        results = []
+        try:
+            for result in call:
+                results.append(result)
+        except CallErrors as errors:
+            return results, list(errors)
+        return results, []
+
+    def test_results(self):
+        backends = [FakeBackend('a'), FakeBackend('b')]
+        results, errors = self.consume(self.call(backends, 'iter_results'))
+        self.assertEquals(sorted(results), ['a-0', 'a-1', 'a-2', 'b-0', 'b-1', 'b-2'])
+        self.assertEquals(errors, [])
+
+    def test_errors(self):
+        backend = FakeBackend('a')
+        call = self.call([backend, FakeBackend('b')], lambda b: b.fail() if b is backend else b.name)
+        results, errors = self.consume(call)
+        self.assertEquals(results, ['b'])
+        self.assertEquals(len(errors), 1)
+        self.assertIs(errors[0][0], backend)
+        self.assertIsInstance(errors[0][1], ValueError)
+
+    def test_timeout(self):
+        slow, fast = FakeBackend('slow'), FakeBackend('fast')
+        start = time.time()
+        call = self.call([slow, fast], lambda b: b.iter_results(delay=1 if b is slow else 0), timeout=0.2)
+        results, errors = self.consume(call)
+        self.assertLess(time.time() - start, 0.8)
+        self.assertEquals(sorted(results), ['fast-0', 'fast-1', 'fast-2'])
+        self.assertEquals(len(errors), 1)
+        self.assertIs(errors[0][0], slow)
+        self.assertIsInstance(errors[0][1], BackendTimeout)
+
+    def test_timeout_single_result(self):
+        slow = FakeBackend('slow')
+        call = self.call([slow], 'get_result', 0.3, timeout=0.1)
+        results, errors = self.consume(call)
+        self.assertEquals(results, [])
+        self.assertIsInstance(errors[0][1], BackendTimeout)
+
+        # The late result is not queued after the timeout was reported.
+        self.assertTrue(slow.finished.wait(1))
+        time.sleep(0.05)
+        self.assertTrue(call.responses.empty())
+
+    def test_per_backend_timeout(self):
+        backends = [FakeBackend('a'), FakeBackend('b')]
+        # Backends are called one after the other, each within its deadline.
+        call = self.call(backends, 'iter_results', 1, 0.3, max_workers=1, per_backend_timeout=0.5)
+        results, errors = self.consume(call)
+        self.assertEquals(sorted(results), ['a-0', 'b-0'])
+        self.assertEquals(errors, [])
+
+        backends = [FakeBackend('a'), FakeBackend('b')]
+        call = self.call(backends, 'iter_results', 1, 0.3, max_workers=1, timeout=0.5)
+        results, errors = self.consume(call)
+        self.assertEquals(len(results), 1)
+        self.assertIsInstance(errors[0][1], BackendTimeout)
+
+    def test_consumer_stops(self):
+        backend = FakeBackend('a')
+        call = self.call([backend], 'iter_endless', queue_size=2)
+        iterator = iter(call)
+        self.assertEquals([next(iterator) for _ in xrange(3)], [0, 1, 2])
+        # The backend is blocked on the full queue, and stops when the
+        # consumer does.
+        iterator.close()
+        self.assertTrue(call.cancelled)
+        self.assertTrue(backend.finished.wait(1))
+
+    def test_cancel(self):
+        backends = [FakeBackend('a'), FakeBackend('b')]
+        call = self.call(backends, 'iter_endless', max_workers=1)
+        event = Event()
+        call.set_wakeup(event.set)
+        self.assertTrue(event.wait(1))
+        call.cancel()
+        self.assertTrue(call.done)
+        self.assertEquals(list(call), [])
+
+        # The running backend stops, and the other one is not called.
+        self.assertTrue(backends[0].finished.wait(1) or backends[1].finished.wait(1))
+        time.sleep(0.05)
+        self.assertFalse(backends[0].finished.is_set() and backends[1].finished.is_set())
+
+    def test_cancel_callback_thread(self):
+        backend = FakeBackend('a')
+        call = self.call([backend], 'get_result', 1)
+        finished = Event()
+        thread = call.callback_thread(None, finishback=finished.set)
+        # The callback thread is blocked until a result comes.
+        time.sleep(0.05)
+        call.cancel()
+        self.assertTrue(finished.wait(0.5))
+        thread.join(0.5)
+        self.assertFalse(thread.is_alive())
+
+    def test_wait_bounded_queue(self):
+        backends = [FakeBackend('a'), FakeBackend('b')]
+        call = self.call(backends, 'iter_results', 100, queue_size=1)
+        thread = Thread(target=call.wait)
+        thread.start()
+        thread.join(2)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(call.done)
+
+    def test_wait_errors(self):
+        call = self.call([FakeBackend('a')], 'fail', queue_size=1)
+        self.assertRaises(CallErrors, call.wait)
+        call = self.call([FakeBackend('a')], 'get_result', 1, timeout=0.1)
+        self.assertRaises(CallErrors, call.wait)
+
+    def test_wakeup(self):
+        event = Event()
+        backends = [FakeBackend('a'), FakeBackend('b')]
+        call = self.call(backends, 'iter_results', 2, 0.05)
+        call.set_wakeup(event.set)
+
+        results = []
+        while not call.done:
+            self.assertTrue(event.wait(1))
+            event.clear()
+            results.extend(call.iter_ready())
+        self.assertEquals(sorted(results), ['a-0', 'a-1', 'b-0', 'b-1'])
+
+    def test_stopped_pool(self):
+        backend = FakeBackend('a')
+        call = self.call([backend], 'get_result', 0.2)
+        # Running calls end after shutdown, but no new one can be started.
+        self.pool.shutdown(wait=False)
+        self.assertRaises(PoolStopped, self.call, [FakeBackend('b')], 'get_result')
+        self.pool.join()
+        self.assertTrue(backend.finished.is_set())
+        self.assertEquals(self.consume(call), (['a'], []))
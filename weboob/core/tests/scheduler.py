@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import time
+from threading import Event
+from unittest import TestCase
+
+from weboob.core.scheduler import Scheduler
+
+
+class Recorder(object):
+    """
+    Callback recording when it is called, and lasting *duration* seconds.
+    """
+    __name__ = 'recorder'
+
+    def __init__(self, duration=0, calls=None):
+        self.duration = duration
+        self.calls = calls
+        self.times = []
+        self.done = Event()
+
+    def __call__(self, *args):
+        self.times.append(time.time())
+        self.args = args
+        if self.calls is not None and len(self.times) >= self.calls:
+            self.done.set()
+        time.sleep(self.duration)
+
+    @property
+    def gaps(self):
+        return [b - a for a, b in zip(self.times, self.times[1:])]
+
+
+# Class that tests the dispatcher of scheduled and repeated events
+class SchedulerTest(TestCase):
+
+    def setUp(self):
+        self.scheduler = Scheduler()
+        self.start = time.time()
+
+    def tearDown(self):
+        self.scheduler.want_stop()
+
+    def test_schedule(self):
+        recorder = Recorder(calls=1)
+        self.scheduler.schedule(0.1, recorder, 'a', 'b')
+        self.assertTrue(recorder.done.wait(1))
+        self.assertGreaterEqual(recorder.times[0] - self.start, 0.1)
+        self.assertEquals(recorder.args, ('a', 'b'))
+
+        # Called only once.
+        time.sleep(0.15)
+        self.assertEquals(len(recorder.times), 1)
+
+    def test_order(self):
+        calls = []
+        done = Event()
+        self.scheduler.schedule(0.15, lambda: (calls.append(2), done.set()))
+        self.scheduler.schedule(0.05, calls.append, 1)
+        self.assertTrue(done.wait(1))
+        self.assertEquals(calls, [1, 2])
+
+    def test_repeat(self):
+        recorder = Recorder(calls=4)
+        self.scheduler.repeat(0.05, recorder)
+        self.assertTrue(recorder.done.wait(1))
+        # First call is immediate.
+        self.assertLess(recorder.times[0] - self.start, 0.04)
+        for gap in recorder.gaps[:3]:
+            self.assertGreaterEqual(gap, 0.04)
+            self.assertLess(gap, 0.09)
+
+    def test_repeat_exception(self):
+        done = Event()
+        calls = []
+
+        def fail():
+            calls.append(None)
+            if len(calls) >= 3:
+                done.set()
+            raise ValueError('broken')
+
+        self.scheduler.repeat(0.02, fail)
+        self.assertTrue(done.wait(1))
+
+    def test_cancel(self):
+        recorder = Recorder()
+        ev = self.scheduler.schedule(0.05, recorder)
+        self.assertTrue(self.scheduler.cancel(ev))
+        self.assertFalse(self.scheduler.cancel(ev))
+
+        recorder2 = Recorder(calls=2)
+        ev = self.scheduler.repeat(0.05, recorder2)
+        self.assertTrue(recorder2.done.wait(1))
+        self.assertTrue(self.scheduler.cancel(ev))
+
+        time.sleep(0.15)
+        self.assertEquals(recorder.times, [])
+        self.assertEquals(len(recorder2.times), 2)
+
+    def test_want_stop(self):
+        recorder = Recorder()
+        self.scheduler.schedule(0.05, recorder)
+        self.scheduler.want_stop()
+        self.assertEquals(self.scheduler.schedule(0, recorder), None)
+        time.sleep(0.1)
+        self.assertEquals(recorder.times, [])
+
+    def test_missed_delay(self):
+        # Calls last longer than the interval, which is counted after the
+        # end of each call.
+        recorder = Recorder(duration=0.1, calls=3)
+        self.scheduler.repeat(0.05, recorder, missed=Scheduler.MISSED_DELAY)
+        self.assertTrue(recorder.done.wait(1))
+        for gap in recorder.gaps:
+            self.assertGreaterEqual(gap, 0.15)
+
+    def test_missed_skip(self):
+        # Ticks are at 0, 0.06, 0.12, 0.18... The tick missed during each
+        # call is skipped, and the next call happens at the following tick.
+        recorder = Recorder(duration=0.1, calls=3)
+        self.scheduler.repeat(0.06, recorder, missed=Scheduler.MISSED_SKIP)
+        self.assertTrue(recorder.done.wait(1))
+        for gap in recorder.gaps:
+            self.assertGreaterEqual(gap, 0.11)
+            self.assertLess(gap, 0.15)
+
+    def test_missed_catchup(self):
+        # Missed ticks are run immediately after the end of each call.
+        recorder = Recorder(duration=0.1, calls=4)
+        self.scheduler.repeat(0.05, recorder, missed=Scheduler.MISSED_CATCHUP)
+        self.assertTrue(recorder.done.wait(1))
+        for gap in recorder.gaps:
+            self.assertGreaterEqual(gap, 0.1)
+            self.assertLess(gap, 0.14)
+
+    def test_missed_unknown(self):
+        self.assertRaises(AssertionError, self.scheduler.repeat, 1, Recorder(), missed='sometimes')
+
+    def test_jitter(self):
+        recorders = [Recorder(calls=1) for _ in xrange(5)]
+        for recorder in recorders:
+            self.scheduler.schedule(0.05, recorder, jitter=0.1)
+        for recorder in recorders:
+            self.assertTrue(recorder.done.wait(1))
+            self.assertGreaterEqual(recorder.times[0] - self.start, 0.05)
+            self.assertLess(recorder.times[0] - self.start, 0.2)
@@ -368,7 +368,9 @@ class Application(object):
             log_settings['ssl_insecure'] = True
 
         # this only matters to developers
-        if not self.options.debug and not self.options.save_responses:
+        if self.options.debug or self.options.save_responses:
+            BaseObject.DEBUG_CONVERSIONS = True
+        else:
             warnings.simplefilter('ignore', category=ConversionWarning)
             warnings.simplefilter('ignore', category=FormFieldConversionWarning)
 
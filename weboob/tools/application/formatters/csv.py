@@ -18,6 +18,8 @@
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
 
+from itertools import izip, imap
+
 from .iformatter import IFormatter
 
 
@@ -41,3 +43,14 @@ class CSVFormatter(IFormatter):
 
         result += self.field_separator.join(unicode(v) for v in item.itervalues())
         return result
+
+    def format_columns(self, columns):
+        rows = izip(*columns.values())
+        lines = [self.field_separator.join(imap(unicode, row)) for row in rows]
+        if not lines:
+            return
+
+        if not self.started:
+            lines.insert(0, self.field_separator.join(columns.iterkeys()))
+            self.started = True
+        self.output(u'\n'.join(lines))
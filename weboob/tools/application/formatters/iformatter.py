@@ -226,6 +226,18 @@ class IFormatter(object):
         """
         return NotImplementedError()
 
+    def format_columns(self, columns):
+        """
+        Format objects exported by :func:`weboob.capabilities.base.BaseObject.to_columns`.
+
+        Formatters which do not support this raise :class:`NotImplementedError`,
+        and objects have to be formatted one by one with :func:`format`.
+
+        :param columns: columns to format
+        :type columns: :class:`OrderedDict`
+        """
+        raise NotImplementedError()
+
     def format_collection(self, collection, only):
         """
         Format a collection to be human-readable.
@@ -18,6 +18,8 @@
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
 
+from itertools import izip
+
 from weboob.capabilities.base import NotAvailable, NotLoaded
 from weboob.tools.json import json
 
@@ -71,8 +73,60 @@ class JsonLineFormatter(IFormatter):
     def format_dict(self, item):
         self.output(json.dumps(item, cls=Encoder))
 
+    def format_columns(self, columns):
+        encode = Encoder().encode
+        keys = [u'%s: ' % encode(name) for name in columns.iterkeys()]
+        # Integers of typed columns do not need the encoder (but bools,
+        # which are also int instances, do).
+        numbers = [column.type is int for column in columns.itervalues()]
+
+        lines = []
+        for row in izip(*columns.values()):
+            items = []
+            for key, number, value in izip(keys, numbers, row):
+                if number and type(value) in (int, long):
+                    items.append(key + str(value))
+                else:
+                    items.append(key + encode(value))
+            lines.append(u'{%s}' % u', '.join(items))
+        if lines:
+            self.output(u'\n'.join(lines))
+
 
 def test():
     from .iformatter import formatter_test_output as fmt
     assert fmt(JsonFormatter, {'foo': 'bar'}) == '[{"foo": "bar"}]\n'
     assert fmt(JsonLineFormatter, {'foo': 'bar'}) == '{"foo": "bar"}\n'
+
+
+def test_columns():
+    from weboob.capabilities.base import BaseObject, IntField, StringField, NotLoaded
+
+    class Obj(BaseObject):
+        count = IntField('Count')
+        name = StringField('Name')
+
+    from .iformatter import formatter_test_output as fmt
+    obj = Obj(u'1', 'backend')
+    obj.count = 42
+    obj.name = u'foo'
+    expected = fmt(JsonLineFormatter, obj)
+    assert expected == '{"id": "1@backend", "count": 42, "name": "foo"}\n'
+
+    class Formatter(JsonLineFormatter):
+        def format(self, obj, selected_fields=None, alias=None):
+            self.format_columns(Obj.to_columns([obj]))
+
+    assert fmt(Formatter, obj) == expected
+
+    del obj.name
+    assert Obj.to_columns([obj])['name'] == [NotLoaded]
+
+    class Flag(BaseObject):
+        flag = IntField('Flag', default=False)
+
+    class Formatter(JsonLineFormatter):
+        def format(self, obj, selected_fields=None, alias=None):
+            self.format_columns(Flag.to_columns([obj]))
+
+    assert fmt(Formatter, Flag(u'1')) == '{"id": "1", "flag": false}\n'
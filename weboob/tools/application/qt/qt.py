@@ -21,6 +21,7 @@ from __future__ import print_function
 
 import sys
 import logging
+import random
 import re
 from threading import Event
 from copy import copy
@@ -46,24 +47,35 @@ __all__ = ['QtApplication', 'QtMainWindow', 'QtDo', 'HTMLDelegate']
 
 
 class QtScheduler(IScheduler):
+    """
+    Scheduler which runs events in the Qt event loop.
+
+    The *jitter* keyword argument of :func:`schedule` and :func:`repeat` is
+    supported. *missed* is ignored: Qt does not queue timeouts missed while
+    the event loop is busy, so they are always skipped.
+    """
     def __init__(self, app):
         self.app = app
         self.count = 0
         self.timers = {}
 
-    def schedule(self, interval, function, *args):
+    def schedule(self, interval, function, *args, **kwargs):
+        jitter = kwargs.get('jitter', 0)
+
         timer = QTimer()
-        timer.setInterval(interval * 1000)
+        timer.setInterval(self.get_msecs(interval, jitter))
         timer.setSingleShot(True)
 
         count = self.count
         self.count += 1
 
         timer.start()
-        self.app.connect(timer, SIGNAL("timeout()"), lambda: self.timeout(count, None, function, *args))
+        self.app.connect(timer, SIGNAL("timeout()"), lambda: self.timeout(count, None, jitter, function, *args))
         self.timers[count] = timer
 
-    def repeat(self, interval, function, *args):
+    def repeat(self, interval, function, *args, **kwargs):
+        jitter = kwargs.get('jitter', 0)
+
         timer = QTimer()
         timer.setSingleShot(False)
 
@@ -71,15 +83,20 @@ class QtScheduler(IScheduler):
         self.count += 1
 
         timer.start(0)
-        self.app.connect(timer, SIGNAL("timeout()"), lambda: self.timeout(count, interval, function, *args))
+        self.app.connect(timer, SIGNAL("timeout()"), lambda: self.timeout(count, interval, jitter, function, *args))
         self.timers[count] = timer
 
-    def timeout(self, _id, interval, function, *args):
+    def get_msecs(self, interval, jitter):
+        if jitter:
+            interval += random.uniform(0, jitter)
+        return int(interval * 1000)
+
+    def timeout(self, _id, interval, jitter, function, *args):
         function(*args)
         if interval is None:
             self.timers.pop(_id)
         else:
-            self.timers[_id].setInterval(interval * 1000)
+            self.timers[_id].setInterval(self.get_msecs(interval, jitter))
 
     def want_stop(self):
         self.app.quit()
@@ -20,6 +20,7 @@
 from __future__ import print_function
 
 import atexit
+from itertools import groupby
 from cmd import Cmd
 import logging
 import re
@@ -103,6 +104,8 @@ class ReplApplication(Cmd, ConsoleApplication):
     EXTRA_FORMATTERS = {}
     DEFAULT_FORMATTER = 'multiline'
     COMMANDS_FORMATTERS = {}
+    # Number of objects buffered by the --bulk option before being formatted.
+    BULK_SIZE = 1000
 
     # Objects to allow in do_ls / do_cd
     COLLECTION_OBJECTS = tuple()
@@ -130,6 +133,7 @@ class ReplApplication(Cmd, ConsoleApplication):
         for key, klass in self.EXTRA_FORMATTERS.iteritems():
             self.formatters_loader.register_formatter(key, klass)
         self.formatter = None
+        self.bulk_objects = []
         self.commands_formatters = self.COMMANDS_FORMATTERS.copy()
 
         commands_help = self.get_commands_doc()
@@ -141,6 +145,8 @@ class ReplApplication(Cmd, ConsoleApplication):
         results_options.add_option('-n', '--count', type='int',
                                    help='limit number of results (from each backends)')
         results_options.add_option('-s', '--select', help='select result item keys to display (comma separated)')
+        results_options.add_option('--timeout', type='float',
+                                   help='maximum number of seconds to wait for backends, then display results gathered so far')
         self._parser.add_option_group(results_options)
 
         formatting_options = OptionGroup(self._parser, 'Formatting Options')
@@ -150,6 +156,8 @@ class ReplApplication(Cmd, ConsoleApplication):
         formatting_options.add_option('--no-header', dest='no_header', action='store_true', help='do not display header')
         formatting_options.add_option('--no-keys', dest='no_keys', action='store_true', help='do not display item keys')
         formatting_options.add_option('-O', '--outfile', dest='outfile', help='file to export result')
+        formatting_options.add_option('--bulk', action='store_true',
+                                      help='export results in bulk, column by column (faster with csv and json_line formatters)')
         self._parser.add_option_group(formatting_options)
 
         self._interactive = False
@@ -354,6 +362,9 @@ class ReplApplication(Cmd, ConsoleApplication):
 
         fields = self.parse_fields(fields)
 
+        if self.options.timeout and 'timeout' not in kwargs:
+            kwargs['timeout'] = self.options.timeout
+
         if fields and self.formatter.MANDATORY_FIELDS is not None:
             missing_fields = set(self.formatter.MANDATORY_FIELDS) - set(fields)
             # If a mandatory field is not selected, do not use the customized formatter
@@ -1215,6 +1226,20 @@ class ReplApplication(Cmd, ConsoleApplication):
         return fields
 
     def format(self, result, alias=None):
+        # Columns have no alias, so objects displayed with one (in
+        # interactive mode) are not buffered.
+        if self.options.bulk and alias is None and isinstance(result, BaseObject):
+            self.bulk_objects.append(result)
+            if len(self.bulk_objects) >= self.BULK_SIZE:
+                self.flush_bulk()
+            return
+
+        # Keep the order of results.
+        if self.bulk_objects:
+            self.flush_bulk()
+        self._format(result, alias)
+
+    def _format(self, result, alias=None):
         fields = self.parse_fields(self.selected_fields)
         try:
             self.formatter.format(obj=result, selected_fields=fields, alias=alias)
@@ -1223,5 +1248,45 @@ class ReplApplication(Cmd, ConsoleApplication):
         except MandatoryFieldsNotFound as e:
             print('%s Hint: select missing fields or use another formatter (ex: multiline).' % e, file=self.stderr)
 
+    def flush_bulk(self):
+        """
+        Format objects buffered in bulk mode, as columns of objects of the
+        same class.
+        """
+        objects, self.bulk_objects = self.bulk_objects, []
+        fields = self.parse_fields(self.selected_fields)
+        mandatory = self.formatter.MANDATORY_FIELDS
+
+        for klass, group in groupby(objects, type):
+            group = list(group)
+            if mandatory:
+                # Objects which miss a mandatory field are refused one by
+                # one, like with IFormatter.format().
+                complete = []
+                for obj in group:
+                    if all(hasattr(obj, name) for name in mandatory):
+                        complete.append(obj)
+                    else:
+                        self._format(obj)
+                group = complete
+                if not group:
+                    continue
+
+            try:
+                columns = klass.to_columns(group, fields)
+                if mandatory:
+                    missing_fields = set(mandatory) - set(columns)
+                    if missing_fields:
+                        raise MandatoryFieldsNotFound(missing_fields)
+                self.formatter.format_columns(columns)
+            except MandatoryFieldsNotFound as e:
+                print('%s Hint: select missing fields or use another formatter (ex: multiline).' % e, file=self.stderr)
+            except NotImplementedError:
+                # The formatter does not support columns.
+                for obj in group:
+                    self._format(obj)
+
     def flush(self):
+        if self.bulk_objects:
+            self.flush_bulk()
         self.formatter.flush()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from itertools import count
+from threading import Lock
+
+
+__all__ = ['LRUCache']
+
+
+class LRUCache(object):
+    """
+    Bounded cache which evicts least recently used entries.
+
+    >>> cache = LRUCache(max_size=2)
+    >>> cache.get('a', lambda: 1)
+    1
+    >>> cache.get('a', lambda: 2)
+    1
+    >>> cache.get('b', lambda: 3), cache.get('c', lambda: 4)
+    (3, 4)
+    >>> sorted(cache.stats().items())
+    [('hits', 1), ('misses', 3), ('size', 2)]
+
+    :param max_size: maximum number of entries kept
+    :type max_size: :class:`int`
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        # key -> [value, last use]
+        self.entries = {}
+        self.clock = count()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        """
+        Get the value of a key, computed by build() if it is missing.
+        """
+        # Hits are lock-free, as they are the common case.
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            entry[1] = next(self.clock)
+            return entry[0]
+
+        # Errors of build() are raised to the caller.
+        value = build()
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = [value, next(self.clock)]
+            if len(self.entries) > self.max_size:
+                # Evict the least recently used quarter at once, to not
+                # sort entries on each miss.
+                entries = sorted(self.entries.iteritems(), key=lambda item: item[1][1])
+                for old_key, _ in entries[:max(1, len(entries) // 4)]:
+                    del self.entries[old_key]
+        return value
+
+    def stats(self):
+        """
+        Get counters, for profiling.
+
+        :rtype: :class:`dict`
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+from lxml import etree
+
+from .lrucache import LRUCache
+
+
+__all__ = ['XPathCache', 'xpath_cache', 'xpath', 'cssselect']
+
+
+class XPathCache(LRUCache):
+    """
+    Bounded LRU cache of compiled XPath and CSS selectors.
+
+    lxml parses and compiles the expression given to
+    :func:`lxml.etree._Element.xpath` on each call, whereas a selector
+    used by a filter is usually evaluated on every row of a page.
+
+    :param max_size: maximum number of compiled selectors kept
+    :type max_size: :class:`int`
+    """
+
+    def get_xpath(self, expression, namespaces=None):
+        """
+        Get a compiled :class:`lxml.etree.XPath`.
+        """
+        ns_key = frozenset(namespaces.iteritems()) if namespaces else None
+        return self.get(('xpath', expression, ns_key),
+                        lambda: etree.XPath(expression, namespaces=namespaces))
+
+    def get_css(self, expression, translator='xml', namespaces=None):
+        """
+        Get a compiled :class:`lxml.cssselect.CSSSelector`.
+        """
+        from lxml.cssselect import CSSSelector
+
+        ns_key = frozenset(namespaces.iteritems()) if namespaces else None
+        return self.get((translator, expression, ns_key),
+                        lambda: CSSSelector(expression, namespaces=namespaces, translator=translator))
+
+
+xpath_cache = XPathCache()
+"""
+Cache shared by the whole process.
+"""
+
+
+def xpath(el, expression, namespaces=None, **variables):
+    """
+    Same as ``el.xpath(expression)``, with a compiled expression taken from
+    :data:`xpath_cache`.
+
+    >>> xpath(etree.fromstring('<a><b/><b id="x"/></a>'), 'count(//b)')
+    2.0
+    >>> xpath(etree.fromstring('<a><b/><b id="x"/></a>'), '//b[@id=$id]', id='x')[0].get('id')
+    'x'
+    """
+    return xpath_cache.get_xpath(expression, namespaces)(el, **variables)
+
+
+def cssselect(el, expression, namespaces=None):
+    """
+    Same as ``el.cssselect(expression)``, with a compiled selector taken
+    from :data:`xpath_cache`.
+    """
+    from lxml.html import HtmlMixin
+
+    root = el.getroot() if isinstance(el, etree._ElementTree) else el
+    translator = 'html' if isinstance(root, HtmlMixin) else 'xml'
+    return xpath_cache.get_css(expression, translator, namespaces)(el)